@@ -0,0 +1,86 @@
+"""Compare the moviepy still video path against StillMuxer.
+
+Run from the repository root:
+
+    python benchmarks/bench_color_clip.py --seconds 600
+"""
+import argparse
+import asyncio
+import math
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "paperboy"))
+
+from audio import PcmEncoder  # noqa: E402
+from muxer import StillMuxer  # noqa: E402
+
+SAMPLE_RATE = 24000
+IMAGE = ROOT / "cat_paper.jpg"
+
+
+def tone(seconds):
+    samples = (
+        int(8000 * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE))
+        for i in range(SAMPLE_RATE * seconds)
+    )
+    return struct.pack(f"<{SAMPLE_RATE * seconds}h", *samples)
+
+
+async def make_audio(path, pcm):
+    async with PcmEncoder(path, SAMPLE_RATE) as encoder:
+        await encoder.add(0, pcm)
+    return encoder.duration
+
+
+def moviepy_video(audio):
+    # The implementation color_clip used before StillMuxer
+    from moviepy.editor import AudioFileClip, ImageClip
+
+    filename = audio.replace(".mp3", "-moviepy.webm")
+    audioclip = AudioFileClip(audio)
+    clip = ImageClip(str(IMAGE), duration=audioclip.duration + 0.1)
+    videoclip = clip.set_audio(audioclip)
+    videoclip.write_videofile(
+        filename, fps=1, audio_bitrate="84k", threads=8, logger=None
+    )
+    return filename
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    size = Path(result if isinstance(result, str) else result[0]).stat().st_size
+    print(f"{label:<28}{elapsed:>8.2f}s {size / 1024:>10.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=300)
+    args = parser.parse_args()
+
+    pcm = tone(args.seconds)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mp3 = str(Path(tmp_dir) / "article.mp3")
+        opus = str(Path(tmp_dir) / "article.opus")
+        duration = asyncio.run(make_audio(mp3, pcm))
+        asyncio.run(make_audio(opus, pcm))
+        muxer = StillMuxer(IMAGE, Path(tmp_dir) / "still")
+
+        print(f"{args.seconds}s of audio")
+        timed("StillMuxer (first, cold)", asyncio.run, muxer.make_video(mp3, duration))
+        timed("StillMuxer (mp3 -> opus)", asyncio.run, muxer.make_video(mp3, duration))
+        timed("StillMuxer (opus copy)", asyncio.run, muxer.make_video(opus, duration))
+        try:
+            timed("moviepy", moviepy_video, mp3)
+        except ImportError:
+            print("moviepy not installed, skipping the old path")
+
+
+if __name__ == "__main__":
+    main()
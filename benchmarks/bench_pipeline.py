@@ -0,0 +1,433 @@
+"""Offline benchmarks for each pipeline stage and the whole article pipeline.
+
+Everything runs against the saved pages and transcript in benchmarks/data.
+OpenAI, Google TTS, Selenium and Discord are replaced by the fakes in
+fakes.py, whose latency can be set on the command line. Every stage runs
+in a fresh process so its peak RSS is its own.
+
+The text stages need the NLTK punkt data, install it with
+``python -m nltk.downloader punkt`` (``punkt_tab`` for nltk 3.9 and later)
+or point NLTK_DATA at a copy. Stages that can't run are reported as
+skipped, which fails ``--check``. Stages without a baseline are reported
+but not checked.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py                   # report
+    python benchmarks/bench_pipeline.py --check           # fail on regressions
+    python benchmarks/bench_pipeline.py --update-baseline # accept new numbers
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HERE = Path(__file__).resolve().parent
+DATA = HERE / "data"
+BASELINE = HERE / "baseline.json"
+
+STAGES = {}
+
+
+def stage(name, unit):
+    def register(func):
+        STAGES[name] = (func, unit)
+        return func
+
+    return register
+
+
+class Run:
+    """Collects the measured part of a stage, setup is not timed.
+
+    Like timeit, the reported rate is the best one seen: slower samples
+    mostly measure other processes competing for the CPU.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.rounds = options["rounds"]
+        self.seconds = 0.0
+        self.samples = []
+        self._elapsed = 0.0
+        self.rss_before = None
+
+    @contextlib.contextmanager
+    def measure(self):
+        if self.rss_before is None:
+            self.rss_before = peak_rss()
+        start = time.perf_counter()
+        yield
+        self._elapsed = time.perf_counter() - start
+        self.seconds += self._elapsed
+
+    def repeat(self):
+        """Yield round numbers until ``rounds`` are done and ``min_time`` passed.
+
+        Fast stages finish a round in milliseconds, running them for a
+        minimum time keeps their numbers stable between runs.
+        """
+        i = 0
+        while i < self.rounds or self.seconds < self.options["min_time"]:
+            yield i
+            i += 1
+
+    def count(self, items, size=0):
+        """Record what the last measured block processed."""
+        self.samples.append((self._elapsed, items, size))
+
+    def best(self):
+        seconds, items, size = min(self.samples, key=lambda s: s[0] / s[1])
+        return items / seconds, size / 1024**2 / seconds
+
+
+def peak_rss():
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def pages():
+    return {
+        path.name: path.read_text()
+        for path in sorted((DATA / "articles").glob("*.html"))
+    }
+
+
+def transcript():
+    return json.loads((DATA / "transcripts" / "lecture.json").read_text())
+
+
+def synthetic_transcript(count):
+    """``count`` segments cycling through the lecture, like a multi-hour stream."""
+    segments = transcript()
+    length = segments[-1]["end"]
+    for i in range(count):
+        segment = segments[i % len(segments)]
+        offset = i // len(segments) * length
+        yield {
+            "start": segment["start"] + offset,
+            "end": segment["end"] + offset,
+            "text": segment["text"],
+        }
+
+
+async def extracted_texts():
+    from app import get_article
+
+    return [
+        await get_article(html, f"https://example.com/{name}")
+        for name, html in pages().items()
+    ]
+
+
+@stage("extract", "pages")
+async def bench_extract(run):
+    from app import get_article
+
+    saved = pages()
+    await extracted_texts()  # Warm up lxml and trafilatura
+    for _ in run.repeat():
+        with run.measure():
+            for name, html in saved.items():
+                await get_article(html, f"https://example.com/{name}")
+        run.count(len(saved), sum(len(html.encode()) for html in saved.values()))
+
+
+@stage("process_text", "articles")
+async def bench_process_text(run):
+    from text_processing import process_text
+
+    articles = await extracted_texts()
+    size = sum(len(article["text"].encode()) for article in articles)
+    for _ in run.repeat():
+        with run.measure():
+            for article in articles:
+                await process_text(article["text"])
+        run.count(len(articles), size)
+
+
+@stage("format_article", "articles")
+async def bench_format_article(run):
+    from text_processing import format_article
+
+    articles = await extracted_texts()
+    size = sum(len(article["text"].encode()) for article in articles)
+    for _ in run.repeat():
+        with run.measure():
+            for article in articles:
+                await format_article(
+                    title=article["title"],
+                    text=article["text"],
+                    author=article["author"],
+                    date=article["date"],
+                )
+        run.count(len(articles), size)
+
+
+@stage("generate_srt", "segments")
+async def bench_generate_srt(run):
+    from youtube_transcript import generate_srt
+
+    segments = transcript()
+    for _ in run.repeat():
+        # generate_srt edits the segments in place
+        fresh = copy.deepcopy(segments)
+        with run.measure():
+            srt = generate_srt(fresh)
+        run.count(len(segments), len(srt.encode()))
+
+
+@stage("srt_to_doc", "segments")
+async def bench_srt_to_doc(run):
+    import pysrt
+    from app import srt_to_doc
+    from youtube_transcript import generate_srt
+
+    srt = generate_srt(transcript())
+    subtitles = pysrt.from_string(srt)
+    for _ in run.repeat():
+        with run.measure():
+            srt_to_doc(subtitles)
+        run.count(len(subtitles), len(srt.encode()))
+
+
+@stage("write_srt_50k", "segments")
+async def bench_write_srt(run):
+    from youtube_transcript import write_srt
+
+    count = 50_000
+    for _ in range(run.rounds):
+        with run.measure():
+            write_srt(synthetic_transcript(count), "stream.srt")
+        run.count(count, Path("stream.srt").stat().st_size)
+
+
+@stage("tts", "chunks")
+async def bench_tts(run):
+    import speech
+    from fakes import FakeTextToSpeech
+    from text_processing import process_text
+    from tts_cache import ChunkCache
+
+    speech._client = FakeTextToSpeech(run.options["tts_latency"])
+    chunks = [
+        chunk
+        for article in await extracted_texts()
+        for chunk in await process_text(article["text"])
+    ]
+    for i in range(run.rounds):
+        # Start cold, cached chunks would skip the service entirely
+        speech.chunk_cache = ChunkCache(f"tts-cache-{i}", max_bytes=1024**3)
+        with run.measure():
+            await speech.text_to_speech(f"tts-{i}.opus", chunks)
+        run.count(len(chunks), sum(len(chunk.encode()) for chunk in chunks))
+
+
+@stage("color_clip", "audio seconds")
+async def bench_color_clip(run):
+    from app import color_clip
+    from audio import PcmEncoder
+
+    seconds = 600
+    async with PcmEncoder("clip.opus", 24000) as encoder:
+        await encoder.add(0, b"\0\0" * 24000 * seconds)
+    # The still track is built once per image, keep that out of the numbers
+    await color_clip("clip.opus", encoder.duration)
+    for _ in range(run.rounds):
+        with run.measure():
+            video, _ = await color_clip("clip.opus", encoder.duration)
+        run.count(seconds, Path(video).stat().st_size)
+
+
+@stage("pipeline", "articles")
+async def bench_pipeline(run):
+    import app
+    import speech
+    import summerizer
+    from fakes import (
+        FakeChannel,
+        FakeCompletions,
+        FakeDriver,
+        FakeMessage,
+        FakePages,
+        FakeTextToSpeech,
+    )
+    from tts_cache import ChunkCache
+    from webdriver_pool import WebDriverPool
+
+    options = run.options
+    saved = pages()
+    completions = FakeCompletions(options["llm_latency"])
+    summerizer.client.base_url = await completions.start()
+    site = FakePages(saved, options["page_latency"])
+    port = await site.start()
+    speech._client = FakeTextToSpeech(options["tts_latency"])
+    app.driver_pool = WebDriverPool(
+        lambda profile: FakeDriver(saved, options["driver_latency"]), size=1
+    )
+
+    async def change_presence(**kwargs):
+        pass
+
+    app.bot.change_presence = change_presence
+    # Half of the articles go through the paywall diversion
+    app.domains.add("127.0.0.1", whitelist=True)
+    app.domains.add("localhost", whitelist=True, paywall=True)
+
+    channel = FakeChannel(options["discord_latency"])
+    try:
+        for i in range(run.rounds):
+            speech.chunk_cache = ChunkCache(f"tts-cache-{i}", max_bytes=1024**3)
+            uploaded = channel.uploaded
+            with run.measure():
+                for j, name in enumerate(saved):
+                    host = "localhost" if j % 2 else "127.0.0.1"
+                    url = f"http://{host}:{port}/articles/{name}?round={i}"
+                    await app.process_article(url, FakeMessage(channel))
+            run.count(len(saved), channel.uploaded - uploaded)
+    finally:
+        await app.driver_pool.close()
+        await app.fetcher.close()
+        await summerizer.client.close()
+        await completions.close()
+        await site.close()
+
+
+def run_stage(name, options, workdir):
+    """Entry point of the child process for one stage."""
+    os.chdir(workdir)
+    sys.path[:0] = [str(ROOT / "paperboy"), str(HERE)]
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    func, unit = STAGES[name]
+    run = Run(options)
+    try:
+        asyncio.run(func(run))
+    except (ImportError, LookupError) as e:
+        # Missing packages, or NLTK data that isn't downloaded
+        # NLTK frames its message with a line of asterisks
+        reason = next(line.strip() for line in str(e).splitlines() if line.strip("* "))
+        return {"skipped": f"{type(e).__name__}: {reason}"}
+    throughput, mb_per_second = run.best()
+    return {
+        "unit": unit,
+        "throughput": throughput,
+        "mb_per_second": mb_per_second,
+        "peak_rss_mb": round(peak_rss(), 1),
+        "rss_growth_mb": round(peak_rss() - (run.rss_before or peak_rss()), 1),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in results.items():
+        expected = baseline.get("stages", {}).get(name)
+        # A stage that didn't run checks nothing
+        if "skipped" in result:
+            found.append(f"{name}: did not run, {result['skipped']}")
+            continue
+        if expected is None:
+            print(f"{name}: no baseline, record one with --update-baseline")
+            continue
+        if result["throughput"] < expected["throughput"] * (1 - tolerance):
+            found.append(
+                f"{name}: {result['throughput']:.2f} {result['unit']}/s, "
+                f"baseline {expected['throughput']:.2f}"
+            )
+        if result["peak_rss_mb"] > expected["peak_rss_mb"] * (1 + tolerance):
+            found.append(
+                f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB, "
+                f"baseline {expected['peak_rss_mb']:.0f} MB"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stages", nargs="*", default=list(STAGES))
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=2.0)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--driver-latency", type=float, default=1.0)
+    parser.add_argument("--page-latency", type=float, default=0.2)
+    parser.add_argument("--discord-latency", type=float, default=0.2)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    options = {
+        "rounds": args.rounds,
+        "min_time": args.min_time,
+        "llm_latency": args.llm_latency,
+        "tts_latency": args.tts_latency,
+        "driver_latency": args.driver_latency,
+        "page_latency": args.page_latency,
+        "discord_latency": args.discord_latency,
+    }
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    if args.check and baseline.get("options") not in (None, options):
+        print(f"warning: baseline was recorded with {baseline['options']}")
+
+    results = {}
+    print(f"{'stage':<16}{'throughput':>24}{'MB/s':>10}{'peak RSS':>12}{'growth':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(ROOT / "cat_paper.jpg", workdir)
+        context = multiprocessing.get_context("spawn")
+        for name in args.stages:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                result = pool.submit(run_stage, name, options, workdir).result()
+            results[name] = result
+            if "skipped" in result:
+                print(f"{name:<16}skipped ({result['skipped']})")
+                continue
+            throughput = f"{result['throughput']:.2f} {result['unit']}/s"
+            print(
+                f"{name:<16}{throughput:>24}{result['mb_per_second']:>10.2f}"
+                f"{result['peak_rss_mb']:>9.0f} MB{result['rss_growth_mb']:>7.0f} MB"
+            )
+
+    if args.update_baseline:
+        stages = baseline.get("stages", {})
+        stages.update(
+            {
+                name: result
+                for name, result in results.items()
+                if "skipped" not in result
+            }
+        )
+        baseline = {
+            "machine": f"{platform.machine()} {platform.python_version()}",
+            "options": options,
+            "stages": stages,
+        }
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE}")
+
+    if args.check:
+        found = regressions(results, baseline, args.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare per message URL extraction before and after urls.find_urls.
+
+Run from the repository root:
+
+    python benchmarks/bench_urls.py --rounds 20
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "paperboy"))
+
+from urls import find_urls, registered_domain  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "data" / "chat_messages.txt"
+
+
+def old_extract(message):
+    # What on_message did before urls.find_urls
+    import validators
+    from urlextract import URLExtract
+
+    extractor = URLExtract()
+    urls = extractor.find_urls(message)
+    return [urlparse(url).netloc for url in urls if validators.url(url)]
+
+
+def new_extract(message):
+    return [registered_domain(urlparse(url).netloc) for url in find_urls(message)]
+
+
+def timed(label, func, messages, rounds):
+    start = time.perf_counter()
+    found = 0
+    for _ in range(rounds):
+        for message in messages:
+            found += len(func(message))
+    elapsed = time.perf_counter() - start
+    per_message = elapsed / (rounds * len(messages)) * 1e6
+    print(f"{label:<12}{elapsed:>8.3f}s {per_message:>10.1f} µs/message")
+    return found // rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = CORPUS.read_text().splitlines()
+    print(f"{len(messages)} messages x {args.rounds} rounds")
+    # Build the shared extractor outside the timing, like the bot does on start
+    find_urls("")
+    new = timed("find_urls", new_extract, messages, args.rounds)
+    old = timed("URLExtract", old_extract, messages, args.rounds)
+    print(f"links found: {old} before, {new} after dedupe")
+    domains = {domain for message in messages for domain in new_extract(message)}
+    print(f"distinct domains: {len(domains)}")
+
+
+if __name__ == "__main__":
+    main()
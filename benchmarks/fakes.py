@@ -0,0 +1,177 @@
+"""Local stand-ins for the services the pipeline talks to.
+
+Each fake sleeps for a configurable latency and returns data shaped like
+the real service, so benchmarks measure PaperBoy and not the network.
+"""
+import asyncio
+import io
+import math
+import time
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+from aiohttp import web
+
+# Roughly how fast the Wavenet voices read
+CHARS_PER_SECOND = 15
+
+
+async def serve(app):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, runner.addresses[0][1]
+
+
+class FakeCompletions:
+    """OpenAI compatible ``/v1/chat/completions`` that answers with a summary."""
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.requests = 0
+
+    async def handler(self, request):
+        body = await request.json()
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        prompt = body["messages"][-1]["content"]
+        words = prompt.split()
+        summary = " ".join(words[:60])
+        return web.json_response(
+            {
+                "model": body["model"],
+                "choices": [{"message": {"role": "assistant", "content": summary}}],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(summary) // 4,
+                },
+            }
+        )
+
+    async def start(self):
+        app = web.Application(client_max_size=64 * 1024**2)
+        app.router.add_post("/v1/chat/completions", self.handler)
+        self.runner, port = await serve(app)
+        return f"http://127.0.0.1:{port}/v1"
+
+    async def close(self):
+        await self.runner.cleanup()
+
+
+class FakePages:
+    """Serves the saved article pages, like the sites would."""
+
+    def __init__(self, pages, latency=0.2):
+        self.pages = pages
+        self.latency = latency
+
+    async def handler(self, request):
+        await asyncio.sleep(self.latency)
+        page = self.pages.get(request.match_info["name"])
+        if page is None:
+            return web.Response(status=404)
+        return web.Response(text=page, content_type="text/html")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/articles/{name}", self.handler)
+        self.runner, self.port = await serve(app)
+        return self.port
+
+    async def close(self):
+        await self.runner.cleanup()
+
+
+def silent_wav(seconds, sample_rate):
+    data = io.BytesIO()
+    with wave.open(data, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\0\0" * int(seconds * sample_rate))
+    return data.getvalue()
+
+
+class FakeTextToSpeech:
+    """Async Google TTS client returning silence as long as the text."""
+
+    def __init__(self, latency=0.3):
+        self.latency = latency
+        self.requests = 0
+
+    async def synthesize_speech(self, input, voice, audio_config):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        seconds = max(1, math.ceil(len(input.text) / CHARS_PER_SECOND))
+        return SimpleNamespace(
+            audio_content=silent_wav(seconds, audio_config.sample_rate_hertz)
+        )
+
+
+class FakeDriver:
+    """Blocking Selenium driver that renders the saved pages."""
+
+    def __init__(self, pages, latency=1.0):
+        self.pages = pages
+        self.latency = latency
+        self.current_url = "about:blank"
+        self.page_source = ""
+
+    def get(self, url):
+        time.sleep(self.latency)
+        self.current_url = url
+        self.page_source = self.pages[url.rsplit("/", 1)[-1].split("?")[0]]
+
+    def quit(self):
+        pass
+
+
+class FakeMessage:
+    """Enough of a discord.Message for the pipeline to reply to."""
+
+    def __init__(self, channel, content=""):
+        self.channel = channel
+        self.content = content
+        self.reactions = []
+        self.edits = 0
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(self.channel.latency)
+        self.reactions.append(emoji)
+
+    async def edit(self, content=None, **kwargs):
+        await asyncio.sleep(self.channel.latency)
+        self.content = content
+        self.edits += 1
+
+    async def delete(self, delay=None):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.sent = []
+        self.uploaded = 0
+
+    async def send(self, content=None, files=(), reference=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for f in files or ():
+            self.uploaded += Path(f.fp.name).stat().st_size
+            f.close()
+        message = FakeMessage(self, content)
+        self.sent.append(message)
+        return message
+
+    def typing(self):
+        return Typing()
+
+
+class Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
@@ -1,4 +1,47 @@
-from app import bot, settings
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def profile_startup(top=25):
+    """Print the slowest imports of the bot, as measured by ``-X importtime``."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(Path(__file__).parent), env.get("PYTHONPATH")])
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        imports.append((int(cumulative), int(own), name.rstrip()))
+
+    print(f"{'cumulative':>12}{'self':>10}  module")
+    for cumulative, own, name in sorted(imports, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f}ms{own / 1000:>8.1f}ms  {name}")
+    # Nested imports are indented, the top level ones add up to the whole startup
+    total = sum(c for c, _, name in imports if not name.startswith("  "))
+    print(f"Importing app took {total / 1e6:.2f}s")
+
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        sys.exit()
+
+    # Imported here so spawned worker processes don't start a second bot
+    from app import bot, settings
+
     bot.run(settings.token)
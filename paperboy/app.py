@@ -1,6 +1,6 @@
 import asyncio
+import atexit
 import logging
-import tempfile
 import time
 from asyncio import TimeoutError
 from datetime import datetime, timedelta
@@ -10,30 +10,36 @@ from urllib.parse import urlparse
 
 import backoff
 import discord
-import google.cloud.texttospeech as tts
-import nltk
-import pytube
-import trafilatura
 import validators
 from aiohttp.client_exceptions import ClientOSError
 from courlan import check_url
 from discord import CustomActivity
 from discord.ext import commands, tasks
+from domain_store import DomainStore
 from dotenv import load_dotenv
-from gtts import gTTS
+from fetcher import Fetcher
 from loguru import logger
-from moviepy.editor import AudioFileClip, ColorClip, ImageClip, concatenate_audioclips
+from metrics import metrics
+from muxer import StillMuxer
 from pydantic import BaseSettings
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from result_cache import ResultCache
+from scheduler import JobScheduler
 from settings import settings
+from singleflight import SingleFlight
 from slugify import slugify
-from sqlitedict import SqliteDict
+from speech import text_to_speech
 from summerizer import new_summarize, summarize
 from system_message import system_message
-from text_processing import format_article, process_text
-from urlextract import URLExtract
-from youtube_transcript import get_transcript, get_youtube_video_id, youtube_to_text
+from text_processing import check_nltk_data, format_article, process_text
+from urls import canonical_url, find_urls, registered_domain
+from upload_plan import estimate_duration, parts_needed, plan_upload, upload_limit
+from webdriver_pool import WebDriverPool
+from youtube_transcript import (
+    caption_transcript,
+    get_transcript,
+    get_youtube_video_id,
+    youtube_to_text,
+)
 
 
 class InterceptHandler(logging.Handler):
@@ -46,55 +52,84 @@ logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO)
 
 directory = Path("./articles")
 directory.mkdir(parents=True, exist_ok=True)
-nltk.download("punkt")
 load_dotenv()
 
 
-async def write_audio_to_tempfile(i, text, tmp_dir, voice_params, audio_config, client):
-    text_input = tts.SynthesisInput(text=text)
-    response = await client.synthesize_speech(
-        input=text_input, voice=voice_params, audio_config=audio_config
-    )
-    tmp_audio_path = Path(tmp_dir) / f"{i}.mp3"
-    with tmp_audio_path.open("wb") as out:
-        out.write(response.audio_content)
-    return AudioFileClip(str(tmp_audio_path))
+# chromedriver_autoinstaller.install()
+def start_driver(profile_dir):
+    # Selenium is only needed for paywalled sites, import it with the first one
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-gpu")
+    # chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--window-size=1920x1080")
+    chrome_options.add_argument("--ignore-ssl-errors=yes")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    driver = webdriver.Remote(settings.selenium_url, options=chrome_options)
+    driver.implicitly_wait(10)
+    return driver
+
+
+driver_pool = WebDriverPool(
+    start_driver,
+    size=settings.selenium_pool_size,
+    max_uses=settings.selenium_max_uses,
+    max_age=settings.selenium_max_age,
+)
 
 
-async def text_to_speech(filename: str, chunked_text: [str]):
-    voice_params = tts.VoiceSelectionParams(
-        language_code="en-US", name="en-US-Wavenet-I"
-    )
-    audio_config = tts.AudioConfig(audio_encoding=tts.AudioEncoding.LINEAR16)
-    client = tts.TextToSpeechAsyncClient()
-
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_audio_clips = await asyncio.gather(
-            *[
-                write_audio_to_tempfile(
-                    i, text, tmp_dir, voice_params, audio_config, client
-                )
-                for i, text in enumerate(chunked_text)
-            ]
-        )
-        concat_clip = concatenate_audioclips(tmp_audio_clips)
-        concat_clip.write_audiofile(filename)
+# settings = Settings()
 
+domains = DomainStore("db.sqlite")
+# Older entries were keyed by the full host, www.example.com
+domains.rekey(registered_domain)
+atexit.register(domains.close)
 
-# chromedriver_autoinstaller.install()
-chrome_options = Options()
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-gpu")
-# chrome_options.add_argument("--headless")
-chrome_options.add_argument("--window-size=1920x1080")
-chrome_options.add_argument("--ignore-ssl-errors=yes")
-chrome_options.add_argument("--ignore-certificate-errors")
-chrome_options.add_argument("--user-data-dir=/tmp/chrome")
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36"
+)
 
 
-# settings = Settings()
+def decode_page(body):
+    from trafilatura.utils import decode_response
+
+    return decode_response(body)
+
 
-db = SqliteDict("db.sqlite", autocommit=True)
+inflight = SingleFlight()
+metrics_server = None
+scheduler = JobScheduler(
+    workers=settings.workers,
+    max_queue=settings.max_queue,
+    stage_limits=settings.stage_limits,
+)
+
+fetcher = Fetcher(
+    USER_AGENT,
+    limit_per_host=settings.fetch_limit_per_host,
+    timeout=settings.fetch_timeout,
+    max_size=settings.fetch_max_size,
+    remembered_size=settings.fetch_remembered_size,
+    decode=decode_page,
+    executor=scheduler.executor,
+)
+
+result_cache = ResultCache(
+    directory,
+    ttl=settings.result_cache_ttl,
+    quota=settings.result_cache_quota,
+    evict_interval=settings.result_cache_evict_interval,
+)
+
+muxer = StillMuxer("cat_paper.jpg", directory / ".still_cache")
+
+# Registered domains, m.youtube.com and music.youtube.com are YouTube too
+YOUTUBE_DOMAINS = {"youtube.com", "youtu.be"}
 
 intents = discord.Intents.all()
 bot = commands.Bot(
@@ -128,24 +163,8 @@ async def _list(ctx):
     pass
 
 
-async def send_paged_message(ctx, content_list, page_size=20):
-    pages = [
-        content_list[i : i + page_size] for i in range(0, len(content_list), page_size)
-    ]
-    for i, page in enumerate(pages):
-        if len(pages) > 1:
-            page_content = f"**Page {i + 1} of {len(pages)}**\n"
-        else:
-            page_content = ""
-        page_content += "```" + "".join(page) + "```"
-        msg = await ctx.send(page_content)
-        await msg.delete(delay=settings.message_lifetime)
-        await asyncio.sleep(0.25)
-
-
-def build_table(db):
-    max_domain_length = max(len(netloc) for netloc in db.keys())
-    spacing = max(20, max_domain_length)
+def build_table(profiles, width=0):
+    spacing = max(20, width, *(len(profile.domain) for profile in profiles))
 
     header = "{:<{spacing}} {:<4}{:<4}{:<4}\n".format(
         "URL", "#️⃣", "✅/❌", "🔒", spacing=spacing
@@ -154,30 +173,100 @@ def build_table(db):
 
     content_list = [header, separator]
 
-    for netloc, value in db.items():
-        count = value.get("count", 0)
-        enabled = "✅" if value["whitelist"] else "❌"
-        paywall = "✅" if value["paywall"] else "❌"
+    for profile in profiles:
+        enabled = "✅" if profile.whitelist else "❌"
+        paywall = "✅" if profile.paywall else "❌"
         line = "{:<{spacing}} {:<4}{:<4}{:<4}\n".format(
-            netloc, count, enabled, paywall, spacing=spacing
+            profile.domain, profile.count, enabled, paywall, spacing=spacing
         )
         content_list.append(line)
     return content_list
 
 
+class DomainPages(discord.ui.View):
+    """One message showing a page of domains, paged with buttons.
+
+    Pages are queried from the domain store when a button is pressed, so
+    only the rows on screen are ever read and rendered.
+    """
+
+    def __init__(self, title, limit=None, page_size=20, **query):
+        super().__init__(timeout=settings.message_lifetime)
+        self.title = title
+        self.page_size = page_size
+        self.query = query
+        self.page = 0
+        total, self.width = domains.measure(
+            query.get("whitelist"), query.get("paywall")
+        )
+        self.total = total if limit is None else max(0, min(limit, total))
+        self.pages = max(1, -(-self.total // page_size))
+
+    def render(self):
+        offset = self.page * self.page_size
+        profiles = domains.query(
+            **self.query,
+            limit=min(self.page_size, self.total - offset),
+            offset=offset,
+        )
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= self.pages - 1
+        table = "".join(build_table(profiles, self.width))
+        return f"**{self.title}** page {self.page + 1} of {self.pages}\n```{table}```"
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        self.page = min(self.pages - 1, self.page + 1)
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+
+async def send_domain_pages(ctx, title, **query):
+    view = DomainPages(title, **query)
+    msg = await ctx.send(view.render(), view=view if view.pages > 1 else None)
+    await msg.delete(delay=settings.message_lifetime)
+    await ctx.message.delete(delay=settings.message_lifetime)
+
+
 @_list.command(name="all")
 async def all(ctx):
     """List all domains in the database"""
-    content_list = build_table(db)
-    await send_paged_message(ctx, content_list)
-    await ctx.message.delete(delay=settings.message_lifetime)
+    await send_domain_pages(ctx, "All domains")
+
+
+@_list.command(name="whitelisted")
+async def whitelisted(ctx):
+    """List domains that are parsed"""
+    await send_domain_pages(ctx, "Whitelisted domains", whitelist=True)
+
+
+@_list.command(name="blocked")
+async def blocked(ctx):
+    """List domains that are ignored"""
+    await send_domain_pages(ctx, "Blocked domains", whitelist=False)
+
+
+@_list.command(name="paywalled")
+async def paywalled(ctx):
+    """List domains with paywall diversion"""
+    await send_domain_pages(ctx, "Paywalled domains", paywall=True)
+
+
+@_list.command(name="top")
+async def top(ctx, n: int = 10):
+    """List the N domains with the most articles"""
+    await send_domain_pages(ctx, f"Top {n} domains", limit=n, by_count=True)
 
 
 @_list.command(name="add")
 async def add(ctx, url):
     """Add a domain to the whitelist"""
     url_parsed = urlparse(url)
-    domain = str(url_parsed.netloc) or url
+    domain = registered_domain(str(url_parsed.netloc) or url)
     if validators.domain(domain) is not True:
         msg = await ctx.send(
             f"❗ **Invalid Domain:** Couldn't find a valid domain in `{url}`."
@@ -186,10 +275,9 @@ async def add(ctx, url):
         await ctx.message.delete(delay=settings.message_lifetime)
         return
 
-    if domain not in db:
-        db[domain] = {"whitelist": True, "paywall": False, "count": 0}
-        single_entry_db = {domain: db[domain]}
-        content_list = build_table(single_entry_db)
+    if domain not in domains:
+        profile = domains.add(domain, whitelist=True)
+        content_list = build_table([profile])
         msg = f"**New Entry Added:**\n```"
         msg += "".join(content_list)
         msg += "```"
@@ -208,9 +296,9 @@ async def add(ctx, url):
 async def rm(ctx, url):
     """Remove a domain from the whitelist"""
     url_parsed = urlparse(url)
-    domain = str(url_parsed.netloc) or url
+    domain = registered_domain(str(url_parsed.netloc) or url)
 
-    if domain not in db:
+    if domain not in domains:
         msg = await ctx.send(
             f"❗ **Domain Not Found:** `{domain}` is not in the database."
         )
@@ -218,7 +306,7 @@ async def rm(ctx, url):
         await ctx.message.delete(delay=settings.message_lifetime)
         return
 
-    del db[domain]
+    domains.remove(domain)
 
     msg = await ctx.send(
         f"🗑️ **Domain Removed:** `{domain}` has been removed from the database."
@@ -231,9 +319,9 @@ async def rm(ctx, url):
 async def paywall(ctx, url):
     """Turn on and off paywall diversion."""
     url_parsed = urlparse(url)
-    domain = str(url_parsed.netloc) or url
+    domain = registered_domain(str(url_parsed.netloc) or url)
 
-    if domain not in db:
+    if domain not in domains:
         msg = await ctx.send(
             f"❗ **Domain Not Found:** `{domain}` is not in the database."
         )
@@ -241,12 +329,9 @@ async def paywall(ctx, url):
         await ctx.message.delete(delay=settings.message_lifetime)
         return
 
-    url_profile = db[domain]
-    url_profile["paywall"] = not url_profile["paywall"]
-    db[domain] = url_profile
-
-    single_entry_db = {domain: db[domain]}
-    content_list = build_table(single_entry_db)
+    profile = domains.get(domain)
+    profile = domains.update(domain, paywall=not profile.paywall)
+    content_list = build_table([profile])
     msg_content = f"🔄 **Paywall Toggled for:** `{domain}`\n```"
     msg_content += "".join(content_list)
     msg_content += "```"
@@ -260,9 +345,9 @@ async def paywall(ctx, url):
 async def whitelist(ctx, url):
     """Add or remove a domain from the whitelist."""
     url_parsed = urlparse(url)
-    domain = str(url_parsed.netloc) or url
+    domain = registered_domain(str(url_parsed.netloc) or url)
 
-    if domain not in db:
+    if domain not in domains:
         msg = await ctx.send(
             f"❗ **Domain Not Found:** `{domain}` is not in the database."
         )
@@ -270,12 +355,9 @@ async def whitelist(ctx, url):
         await ctx.message.delete(delay=settings.message_lifetime)
         return
 
-    url_profile = db[domain]
-    url_profile["whitelist"] = not url_profile["whitelist"]
-    db[domain] = url_profile
-
-    single_entry_db = {domain: db[domain]}
-    content_list = build_table(single_entry_db)
+    profile = domains.get(domain)
+    profile = domains.update(domain, whitelist=not profile.whitelist)
+    content_list = build_table([profile])
     msg_content = f"🔄 **Whitelist Toggled for:** `{domain}`\n```"
     msg_content += "".join(content_list)
     msg_content += "```"
@@ -339,72 +421,107 @@ async def ping(ctx, num_trials: int = 5):
     await ctx.message.delete(delay=settings.message_lifetime)
 
 
+@bot.command(name="queue", description="Show pipeline load.")
+async def queue(ctx):
+    """Show queued jobs and how busy each stage is"""
+    snapshot = scheduler.snapshot()
+    msg = (
+        f"📬 **Queue:** {snapshot['depth']} waiting, "
+        f"{snapshot['active']}/{snapshot['workers']} running\n```"
+    )
+    msg += "{:<12}{:<9}{:<9}{:<5}\n".format("stage", "running", "waiting", "max")
+    for stage, (running, waiting, limit) in snapshot["stages"].items():
+        msg += "{:<12}{:<9}{:<9}{:<5}\n".format(stage, running, waiting, limit)
+    msg += "```"
+    msg = await ctx.send(msg)
+    await msg.delete(delay=settings.message_lifetime)
+    await ctx.message.delete(delay=settings.message_lifetime)
+
+
+@bot.command(name="stats", description="Show pipeline latency.")
+async def stats(ctx):
+    """Show how long each pipeline stage takes"""
+    msg = "⏱️ **Stage latency** (recent runs)\n```"
+    msg += "{:<26}{:>6}{:>9}{:>9}\n".format("stage", "runs", "p50", "p95")
+    for stage, (count, p50, p95) in metrics.percentiles().items():
+        msg += "{:<26}{:>6}{:>8.1f}s{:>8.1f}s\n".format(stage, count, p50, p95)
+    msg += "\n"
+    for name, value in metrics.counters().items():
+        msg += f"{name} {value:g}\n"
+    msg += "```"
+    msg = await ctx.send(msg)
+    await msg.delete(delay=settings.message_lifetime)
+    await ctx.message.delete(delay=settings.message_lifetime)
+
+
 @bot.event
 async def on_ready():
+    global metrics_server
     for guild in bot.guilds:
         if guild.id == settings.guild:
             break
     changeStatus.start()
+    asyncio.create_task(driver_pool.start())
+    asyncio.create_task(domains.flush_periodically())
+    asyncio.create_task(result_cache.evict_periodically(scheduler.executor))
+    # Also warms up the nltk import off the event loop before the first article
+    asyncio.create_task(asyncio.to_thread(check_nltk_data))
+    if settings.metrics_port and metrics_server is None:
+        metrics_server = await metrics.serve(
+            settings.metrics_host, settings.metrics_port
+        )
     logger.info(
         f"{bot.user} is connected to the following guild:\n"
         f"{guild.name}(id: {guild.id})"
     )
 
 
-async def color_clip(audio):
-    def make_video(audio):
-        filename = f"{audio.replace('.mp3', '.webm')}"
-        audioclip = AudioFileClip(audio)
-        clip = ImageClip("cat_paper.jpg", duration=audioclip.duration + 0.1)
-        # size = (200, 100)
-        # clip = ColorClip(size, color=(0, 0, 0), duration=audioclip.duration + 0.1)
-        videoclip = clip.set_audio(audioclip)
-        videoclip.write_videofile(
-            filename,
-            fps=1,
-            audio_bitrate="84k",
-            threads=8,
-        )
-        return filename, timedelta(seconds=videoclip.duration)
+async def color_clip(audio, duration=None):
+    async with scheduler.stage("video"):
+        with metrics.timer("video"):
+            return await muxer.make_video(audio, duration)
+
 
-    loop = asyncio.get_running_loop()
-    done = loop.run_in_executor(None, make_video, audio)
-    return await done
+async def split_clip(audio, duration, parts):
+    async with scheduler.stage("video"):
+        with metrics.timer("video", method="parts"):
+            return await muxer.make_parts(audio, duration, parts)
 
 
 async def get_source(url):
     def divert_paywall(url):
         url_parsed = urlparse(url)
-        url_profile = db[url_parsed.netloc]
-        return url_profile["paywall"]
-
-    def scrape(url):
-        source = None
-        if divert_paywall(url):
-            logger.info(f"Diverting paywall for url: {url}")
-            driver = webdriver.Remote(settings.selenium_url, options=chrome_options)
-            driver.implicitly_wait(10)
-            driver.get(url)
-            source = driver.page_source
-            driver.quit()
-        else:
-            logger.info(f"Fetching source for url: {url}")
-            source = trafilatura.fetch_url(url)
-        return source
+        return domains.get(registered_domain(url_parsed.netloc)).paywall
+
+    def page_source(driver, url):
+        driver.get(url)
+        return driver.page_source
 
-    loop = asyncio.get_running_loop()
-    done = loop.run_in_executor(None, scrape, url)
-    return await done
+    if divert_paywall(url):
+        logger.info(f"Diverting paywall for url: {url}")
+        async with driver_pool.session() as driver:
+            with metrics.timer("fetch", method="selenium"):
+                return await scheduler.run("fetch", page_source, driver, url)
+    logger.info(f"Fetching source for url: {url}")
+    async with scheduler.stage("fetch"):
+        with metrics.timer("fetch", method="plain"):
+            return await fetcher.fetch(url)
 
 
 async def get_article(source, url):
-    return trafilatura.bare_extraction(
-        source,
-        url=url,
-        include_comments=False,
-        include_tables=False,
-        favor_precision=True,
-    )
+    # trafilatura loads dateparser's timezone tables, the slowest import we have
+    import trafilatura
+
+    with metrics.timer("extract"):
+        return await scheduler.run(
+            "extract",
+            trafilatura.bare_extraction,
+            source,
+            url=url,
+            include_comments=False,
+            include_tables=False,
+            favor_precision=True,
+        )
 
 
 async def backoff_hdlr(details):
@@ -415,50 +532,131 @@ async def backoff_hdlr(details):
     )
 
 
-@backoff.on_exception(
-    backoff.constant, ClientOSError, max_tries=3, interval=1, on_backoff=backoff_hdlr
-)
-async def upload_message(text, video_file_name, text_file_name, reference):
-    await reference.channel.send(
-        text,
-        files=[
-            discord.File(video_file_name),
-            discord.File(text_file_name),
-        ],
-        reference=reference,
-    )
-
-
-def srt_to_doc(srt_file):
-    text = ""
+def doc_parts(srt_file):
+    """Yield the numbered sentences of ``srt_file``, skipping sound cues."""
     for index, item in enumerate(srt_file):
-        ##print(item.text)
         if item.text.startswith("["):
             continue
-        text += "(%d) " % index
-        text += (
+        text = (
             item.text.replace("\n", "")
             .strip("...")
             .replace(".", "")
             .replace("?", "")
             .replace("!", "")
         )
-        text += ". "
-    return text
+        yield f"({index}) {text}. "
+
+
+def srt_to_doc(srt_file):
+    return "".join(doc_parts(srt_file))
+
+
+def youtube_summary(result):
+    author = f"By: {result['author']}"
+    date = f"Published: {result['date']}"
+    return f"> **SUMMARY: {result['title']}**\n> {result['summary']}\n> {author} {date}"
+
+
+def article_summary(result):
+    meta = f"By: __{result['author']}__ published: *{result['date']}*"
+    return f"> **SUMMARY: {result['title']}**\n> {result['summary']}\n> {meta}"
+
+
+# The files are opened again on every try, nothing is encoded twice
+@backoff.on_exception(
+    backoff.expo,
+    (ClientOSError, discord.DiscordServerError),
+    max_tries=4,
+    max_value=10,
+    on_backoff=backoff_hdlr,
+)
+async def upload(message, content, files):
+    async with scheduler.stage("upload"):
+        with metrics.timer("upload"):
+            reply = await message.channel.send(
+                content,
+                files=[discord.File(f) for f in files],
+                reference=message,
+            )
+    metrics.inc("upload_bytes_total", sum(Path(f).stat().st_size for f in files))
+    return reply
+
+
+async def send_summary(result, message, format_summary):
+    return await upload(message, format_summary(result), [result["text_file"]])
+
+
+async def upgrade_summary(text, result, reply, format_summary):
+    """Replace the extractive summary in ``reply`` with the LLM one."""
+    try:
+        async with scheduler.stage("summarize"):
+            with metrics.timer("summary", method="llm"):
+                summary = await asyncio.wait_for(
+                    new_summarize(text), settings.summary_latency_budget
+                )
+    except TimeoutError:
+        logger.warning("LLM summary timed out, keeping the extractive summary")
+        return False
+    except Exception:
+        logger.exception("LLM summary failed, keeping the extractive summary")
+        return False
+    result["summary"] = summary
+    await reply.edit(content=format_summary(result))
+    return True
+
+
+async def post_summary(text, result, message, format_summary):
+    """Reply with a summary of ``text``.
+
+    In progressive mode the local extractive summary is posted right away
+    and a task is returned that edits the reply once the LLM summary
+    arrives, it returns whether it did. Otherwise this returns ``None``.
+    """
+    if not settings.progressive_summary:
+        async with scheduler.stage("summarize"):
+            with metrics.timer("summary", method="llm"):
+                result["summary"] = await new_summarize(text)
+        await send_summary(result, message, format_summary)
+        return None
+
+    with metrics.timer("summary", method="extractive"):
+        result["summary"] = await summarize(text)
+    reply = await send_summary(result, message, format_summary)
+    return asyncio.create_task(upgrade_summary(text, result, reply, format_summary))
+
+
+async def summary_ttl(upgrade):
+    """Wait for the summary upgrade, extractive fallbacks are cached briefly."""
+    if upgrade is None or await upgrade:
+        return None
+    return settings.fallback_summary_ttl
 
 
 async def process_youtube(url, message):
     await message.add_reaction("📰")
+    result = result_cache.get(url)
+    metrics.inc("result_cache_total", result="miss" if result is None else "hit")
+    if result is not None:
+        logger.info(f"cached transcript for {url}")
+        await send_summary(result, message, youtube_summary)
+        return
+
     async with message.channel.typing():
         await bot.change_presence(activity=CustomActivity(name="Copying transcript 📝"))
         video_id = get_youtube_video_id(url)
         text_file_name = f"./articles/{video_id}.txt"
         srt_file_name = f"./articles/{video_id}.srt"
 
-        subtitle = await youtube_to_text(url)
+        with metrics.timer("transcribe", method="captions"):
+            subtitle = await caption_transcript(video_id, srt_file_name)
+        if subtitle is None:
+            async with scheduler.stage("transcribe"):
+                with metrics.timer("transcribe", method="whisper"):
+                    subtitle = await youtube_to_text(url, srt_file_name)
+
+        import pytube
 
         yt_video = pytube.YouTube(url=url)
-        summary = await new_summarize(subtitle["text"])
         with open(text_file_name, "w") as txt:
             txt.write(
                 await format_article(
@@ -468,23 +666,47 @@ async def process_youtube(url, message):
                     date=yt_video.publish_date,
                 )
             )
-        with open(srt_file_name, "w") as srt:
-            srt.write(subtitle["srt"])
         await bot.change_presence(
             activity=CustomActivity(name="Uploading transcript 💾")
         )
-        author = f"By: {yt_video.author}"
-        date = f"Published: {yt_video.publish_date.strftime('%Y-%m-%d')}"
-        await message.channel.send(
-            f"> **SUMMARY: {yt_video.title}**\n> {summary}\n> {author} {date}",
-            files=[discord.File(text_file_name)],
-            reference=message,
-        )
+        result = {
+            "title": yt_video.title,
+            "author": yt_video.author,
+            "date": yt_video.publish_date.strftime("%Y-%m-%d"),
+            "text_file": text_file_name,
+            "srt_file": srt_file_name,
+            "tier": subtitle["tier"],
+        }
+        upgrade = await post_summary(subtitle["text"], result, message, youtube_summary)
+        ttl = await summary_ttl(upgrade)
+        result_cache.put(url, result, [text_file_name, srt_file_name], ttl=ttl)
         await bot.change_presence(activity=CustomActivity(name="Finished 👍"))
 
 
+async def send_article_video(result, message):
+    # Results cached by older versions only have the one video
+    parts = result.get("video_parts") or [
+        [result["video_file"], result["video_length"]]
+    ]
+    for i, (part, seconds) in enumerate(parts, start=1):
+        video_length = timedelta(seconds=seconds)
+        title = result["title"]
+        if len(parts) > 1:
+            title = f"{title} (part {i}/{len(parts)})"
+        meta = f"> **VIDEO: {title}**\n> `length {str(video_length).split('.')[0]}`"
+        await upload(message, meta, [part])
+
+
 async def process_article(url, message):
     await message.add_reaction("📰")
+    result = result_cache.get(url)
+    metrics.inc("result_cache_total", result="miss" if result is None else "hit")
+    if result is not None:
+        logger.info(f"cached article for {url}")
+        await send_summary(result, message, article_summary)
+        await send_article_video(result, message)
+        return
+
     async with message.channel.typing():
         logger.info("downloading article")
         await bot.change_presence(
@@ -495,10 +717,11 @@ async def process_article(url, message):
 
         logger.info("parsing article")
         article = await get_article(source, url)
-        text_file_name = f"{slugify(article['title'])}.txt"
-
-        logger.info("running nlp on article")
-        summary = await new_summarize(article["text"])
+        # Titles repeat across sites, the URL key keeps their files apart
+        file_stem = (
+            f"{slugify(article['title'], max_length=60)}-{ResultCache.file_key(url)}"
+        )
+        text_file_name = f"{file_stem}.txt"
 
         # Save article text to file
         article_file_path = f"./articles/{text_file_name}"
@@ -513,34 +736,87 @@ async def process_article(url, message):
             )
 
         # Upload summary and article text to Discord
-        meta = f"By: __{article['author']}__ published: *{article['date']}*"
-        await message.channel.send(
-            f"> **SUMMARY: {article['title']}**\n> {summary}\n> {meta}",
-            files=[discord.File(article_file_path)],
-            reference=message,
-        )
+        logger.info("running nlp on article")
+        result = {
+            "title": article["title"],
+            "author": article["author"],
+            "date": article["date"],
+            "text_file": article_file_path,
+        }
+        upgrade = await post_summary(article["text"], result, message, article_summary)
 
         # Process video
         logger.info("running text to speech")
         await bot.change_presence(
             activity=discord.Game(name="Recording article 🎙️"),
         )
-        audio_file_name = f"{slugify(article['title'])}.mp3"
+        audio_file_name = f"./articles/{file_stem}.opus"
         chunked_text = await process_text(article["text"])
-        await text_to_speech(f"./articles/{audio_file_name}", chunked_text)
+        # Pick the audio bitrate up front so the first encode fits the upload limit
+        limit = upload_limit(message)
+        plan = plan_upload(
+            estimate_duration(chunked_text), limit, await muxer.still_bitrate()
+        )
+        logger.info(
+            f"Encoding {plan.audio_bitrate} audio for {plan.parts} upload(s), "
+            f"predicted {plan.predicted_size / 1024**2:.1f} MB "
+            f"of {limit / 1024**2:.1f} MB"
+        )
+        last_update = time.monotonic()
+
+        async def progress(done, total):
+            # Presence updates are rate limited, only refresh every few seconds
+            nonlocal last_update
+            if done < total and time.monotonic() - last_update < 5:
+                return
+            last_update = time.monotonic()
+            await bot.change_presence(
+                activity=discord.Game(name=f"Recording article 🎙️ {done}/{total}"),
+            )
+
+        async with scheduler.stage("tts"):
+            with metrics.timer("tts"):
+                duration = await text_to_speech(
+                    audio_file_name, chunked_text, progress, plan.audio_bitrate
+                )
 
         logger.info("running video conversion")
         await bot.change_presence(activity=discord.Game(name="Creating video 📼"))
-        video_file_name, video_length = await color_clip(
-            f"./articles/{audio_file_name}"
-        )
+        result["audio_file"] = audio_file_name
+        if plan.parts > 1:
+            # Even the lowest bitrate won't fit one upload, cut the encoded audio
+            videos = await split_clip(audio_file_name, duration, plan.parts)
+        else:
+            videos = [await color_clip(audio_file_name, duration)]
+            video_file_name = videos[0][0]
+            size = Path(video_file_name).stat().st_size
+            if size > limit:
+                # The estimate was off, cut the audio rather than encode it again
+                parts = parts_needed(size, limit)
+                logger.info(
+                    f"Splitting {size / 1024**2:.1f} MB video into {parts} parts"
+                )
+                videos = await split_clip(audio_file_name, duration, parts)
+                # Too large to upload, only the parts are kept
+                Path(video_file_name).unlink()
+        result["video_parts"] = [
+            [video, length.total_seconds()] for video, length in videos
+        ]
 
         # Edit the original message to add the video
-        meta = f"> **VIDEO: {article['title']}**\n> `length {str(video_length).split('.')[0]}`"
-        await message.channel.send(
-            content=meta,
-            files=[discord.File(video_file_name)],
-            reference=message,
+        await send_article_video(result, message)
+
+        # Only cache the summary once it is final
+        ttl = await summary_ttl(upgrade)
+        result_cache.put(
+            url,
+            result,
+            [
+                article_file_path,
+                audio_file_name,
+                *(video for video, _ in result["video_parts"]),
+            ],
+            ttl=ttl,
         )
 
         logger.info("finished")
@@ -611,7 +887,8 @@ async def process_article(url, message):
 
 async def handle_unknown_domain(url_parsed, message):
     # Your logic for handling unknown domains
-    db[url_parsed.netloc] = {"whitelist": False, "paywall": False, "count": 0}
+    domain = registered_domain(url_parsed.netloc)
+    domains.add(domain)
 
     def check(reaction, user):
         return (
@@ -621,7 +898,7 @@ async def handle_unknown_domain(url_parsed, message):
         )
 
     reply = await message.channel.send(
-        f"**{url_parsed.netloc}** not known, react with ✅ to add to whitelist and parse or 🚫 to ignore.",
+        f"**{domain}** not known, react with ✅ to add to whitelist and parse or 🚫 to ignore.",
         reference=message,
     )
     await reply.add_reaction("✅")
@@ -633,40 +910,69 @@ async def handle_unknown_domain(url_parsed, message):
     else:
         if str(reaction.emoji) == "✅":
             await reply.delete()
-            db[url_parsed.netloc] = {
-                "whitelist": True,
-                "paywall": False,
-                "count": 1,
-            }
-            await process_article(str(url_parsed.geturl()), message)
+            domains.add(domain, whitelist=True)
+            await handle_known_domain(url_parsed, message)
         elif str(reaction.emoji) == "🚫":
             await reply.delete()
     return
 
 
+async def enqueue(job, url, message):
+    # Let the user know when their link has to wait for a free worker
+    position = await scheduler.submit(job, name=url)
+    if position:
+        reply = await message.channel.send(f"⏳ queued (#{position})", reference=message)
+        await reply.delete(delay=settings.message_lifetime)
+
+
 async def handle_known_domain(url_parsed, message):
     # Your logic for handling known domains
-    url_profile = db[url_parsed.netloc]
-
-    url = str(url_parsed.geturl())
-    print(url_parsed.netloc, url_profile)
-    if url_profile["whitelist"]:
-        if url_parsed.netloc in [
-            "www.youtube.com",
-            "youtube.com",
-            "www.youtu.be",
-            "youtu.be",
-        ]:
-            await process_youtube(url, message)
-        else:
-            await process_article(url, message)
-        url_profile["count"] = url_profile.get("count", 0) + 1
-        db[url_parsed.netloc] = url_profile
-        return
-    if not url_profile["whitelist"]:
+    domain = registered_domain(url_parsed.netloc)
+    if not domains.get(domain).whitelist:
         await message.add_reaction("🚫")
         return
 
+    url = str(url_parsed.geturl())
+    if domain in YOUTUBE_DOMAINS:
+        process = process_youtube
+    else:
+        process = process_article
+
+    key = canonical_url(url)
+    while key in inflight:
+        # The same link is already being processed, answer from its result
+        await message.add_reaction("🔗")
+        await inflight.wait(key)
+        if result_cache.get(url) is not None:
+            await process(url, message)
+            return
+
+    async def job():
+        try:
+            with metrics.timer("job", kind=process.__name__):
+                await process(url, message)
+            domains.increment(domain)
+            metrics.inc("jobs_total", status="ok")
+        except Exception:
+            metrics.inc("jobs_total", status="failed")
+            raise
+        finally:
+            inflight.release(key)
+
+    inflight.claim(key)
+    try:
+        await enqueue(job, url, message)
+    except BaseException:
+        inflight.release(key)
+        raise
+
+
+async def handle_url(url_parsed, message):
+    if registered_domain(url_parsed.netloc) not in domains:
+        await handle_unknown_domain(url_parsed, message)
+    else:
+        await handle_known_domain(url_parsed, message)
+
 
 @bot.event
 async def on_message(message):
@@ -685,19 +991,8 @@ async def on_message(message):
 
     logger.info(f"Message {user_message} by {username} on {channel}")
 
-    extractor = URLExtract()
-    urls = extractor.find_urls(user_message)
-
-    for url in urls:
-        # skip domain names
-        if not validators.url(url):
-            continue
-
-        url_parsed = urlparse(url)
-        if url_parsed.netloc not in db:
-            await handle_unknown_domain(url_parsed, message)
-        else:
-            await handle_known_domain(url_parsed, message)
+    urls = find_urls(user_message)
+    await asyncio.gather(*[handle_url(urlparse(url), message) for url in urls])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,317 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+from audio import ffmpeg_exe
+from loguru import logger
+
+SAMPLE_RATE = 16000
+# Slots of the shared array that marks jobs nobody waits for anymore
+FINISHED_SLOTS = 4096
+
+
+def _worker(model_name, threads, jobs, results, finished):
+    # Runs in a child process, torch and whisper never load in the bot itself
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    model = whisper.load_model(model_name)
+    pid = os.getpid()
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, index, offset, pcm = job
+        # Pieces of jobs that failed or were cancelled are left untranscribed
+        if finished[job_id % len(finished)] == job_id:
+            continue
+        # Tell the pool which piece this process holds in case it dies on it
+        results.put((pid, job_id, index, None))
+        try:
+            audio = np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+            result = model.transcribe(audio)
+            segments = [
+                {
+                    "start": segment["start"] + offset,
+                    "end": segment["end"] + offset,
+                    "text": segment["text"],
+                }
+                for segment in result["segments"]
+            ]
+        except Exception as e:
+            segments = repr(e)
+        results.put((pid, job_id, index, segments))
+
+
+async def stream_audio(source, chunk_seconds=2):
+    """Decode ``source`` to 16 kHz mono 16 bit samples as it arrives.
+
+    ``source`` is a path or an async iterator of encoded bytes, which is
+    piped into ffmpeg so decoding starts before the download finishes.
+    """
+    piped = not isinstance(source, (str, os.PathLike))
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg_exe(),
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0" if piped else str(source),
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+        stdin=asyncio.subprocess.PIPE if piped else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def write():
+        try:
+            async for data in source:
+                process.stdin.write(data)
+                await process.stdin.drain()
+        finally:
+            process.stdin.close()
+
+    writer = asyncio.create_task(write()) if piped else None
+    try:
+        leftover = b""
+        while True:
+            data = await process.stdout.read(chunk_seconds * SAMPLE_RATE * 2)
+            if not data:
+                break
+            data = leftover + data
+            # Reads can end in the middle of a sample
+            usable = len(data) // 2 * 2
+            leftover = data[usable:]
+            yield np.frombuffer(data[:usable], np.int16)
+        if writer is not None:
+            await writer
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace')}")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if writer is not None and not writer.done():
+            writer.cancel()
+
+
+def split_on_silence(samples, target=120, search=15, window=0.03):
+    """Split ``samples`` into pieces of at most ``target`` seconds.
+
+    Each cut is placed in the quietest ``window`` within the last ``search``
+    seconds before the target length, so words are rarely cut in half.
+    """
+    frame = int(window * SAMPLE_RATE)
+    limit = target * SAMPLE_RATE
+    usable = len(samples) // frame * frame
+    frames = samples[:usable].reshape(-1, frame).astype(np.float32)
+    energy = np.square(frames).mean(axis=1)
+
+    cuts = [0]
+    while len(samples) - cuts[-1] > limit:
+        end = (cuts[-1] + limit) // frame
+        # Never search the first half so pieces don't become tiny
+        start = max(
+            (cuts[-1] + limit // 2) // frame, end - search * SAMPLE_RATE // frame
+        )
+        quietest = start + int(np.argmin(energy[start:end]))
+        cuts.append(quietest * frame + frame // 2)
+    cuts.append(len(samples))
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+class AsrPool:
+    """Whisper models kept warm in worker processes.
+
+    Audio is split at silences and every piece is queued for the workers.
+    Transcribed segments are yielded in order and with absolute timestamps
+    as soon as the pieces before them are done. Workers that die, killed for
+    memory for example, are replaced and the job whose piece they held fails.
+    """
+
+    def __init__(
+        self,
+        model_name="small.en",
+        processes=1,
+        segment_seconds=120,
+        poll_seconds=30,
+        target=_worker,
+    ):
+        self.model_name = model_name
+        self.processes = processes
+        self.segment_seconds = segment_seconds
+        self.poll_seconds = poll_seconds
+        self.target = target
+        self._workers = []
+        self._waiting = {}
+        # Worker pid to the (job, piece) it is transcribing
+        self._holding = {}
+        self._dead = set()
+        self._ids = itertools.count()
+        self._context = None
+        self._jobs = None
+        self._results = None
+        self._finished = None
+
+    def _spawn(self):
+        threads = max(1, (os.cpu_count() or 1) // self.processes)
+        worker = self._context.Process(
+            target=self.target,
+            args=(
+                self.model_name,
+                threads,
+                self._jobs,
+                self._results,
+                self._finished,
+            ),
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    def start(self):
+        """Start the workers, or replace the ones that have exited."""
+        if self._workers:
+            self._replace_dead()
+            return
+        logger.info(f"Starting {self.processes} ASR worker(s) for {self.model_name}")
+        self._context = multiprocessing.get_context("spawn")
+        self._jobs = self._context.Queue()
+        self._results = self._context.Queue()
+        # Job ids by slot, a newer job only overwrites ones long finished
+        self._finished = self._context.Array("q", [-1] * FINISHED_SLOTS, lock=False)
+        self._workers = [self._spawn() for _ in range(self.processes)]
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def _replace_dead(self):
+        for i, worker in enumerate(self._workers):
+            if worker.is_alive():
+                continue
+            logger.warning(
+                f"ASR worker {worker.pid} exited with {worker.exitcode}, "
+                "starting a new one"
+            )
+            self._dead.add(worker.pid)
+            self._workers[i] = self._spawn()
+        # A piece can be reported after its worker was already replaced
+        for pid, (job_id, index) in list(self._holding.items()):
+            if pid in self._dead:
+                self._holding.pop(pid, None)
+                self._deliver(job_id, index, f"ASR worker {pid} exited")
+
+    def _deliver(self, job_id, index, segments):
+        if job_id in self._waiting:
+            loop, queue = self._waiting[job_id]
+            loop.call_soon_threadsafe(queue.put_nowait, (index, segments))
+
+    def _dispatch(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            pid, job_id, index, segments = item
+            if segments is None:
+                self._holding[pid] = (job_id, index)
+                continue
+            self._holding.pop(pid, None)
+            self._deliver(job_id, index, segments)
+
+    async def transcribe(self, path):
+        async for segment in self.transcribe_stream(stream_audio(path)):
+            yield segment
+
+    async def transcribe_stream(self, chunks, search=15):
+        """Transcribe an async iterator of sample arrays while it is produced.
+
+        Once more than ``segment_seconds`` plus ``search`` seconds are
+        buffered, everything up to the last silence cut is sent to the
+        workers, so inference overlaps with the download.
+        """
+        self.start()
+        job_id = next(self._ids)
+        queue = asyncio.Queue()
+        self._waiting[job_id] = (asyncio.get_running_loop(), queue)
+
+        async def feed():
+            pieces = 0
+            offset = 0
+            buffered = []
+            size = 0
+            limit = (self.segment_seconds + search) * SAMPLE_RATE
+
+            def submit(samples, start):
+                nonlocal pieces
+                self._jobs.put((job_id, pieces, start / SAMPLE_RATE, samples.tobytes()))
+                pieces += 1
+
+            async for chunk in chunks:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size <= limit:
+                    continue
+                samples = np.concatenate(buffered)
+                cuts = split_on_silence(samples, self.segment_seconds, search)
+                for start, end in cuts[:-1]:
+                    submit(samples[start:end], offset + start)
+                keep = cuts[-1][0]
+                offset += keep
+                buffered = [samples[keep:]]
+                size = len(buffered[0])
+            if size:
+                submit(np.concatenate(buffered), offset)
+            logger.info(f"Queued {pieces} audio piece(s) for transcription")
+            return pieces
+
+        feeder = asyncio.create_task(feed())
+        try:
+            done = {}
+            next_index = 0
+            while not feeder.done() or next_index < feeder.result():
+                getter = asyncio.ensure_future(queue.get())
+                waiting = {getter} if feeder.done() else {getter, feeder}
+                finished, _ = await asyncio.wait(
+                    waiting,
+                    timeout=self.poll_seconds,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if getter not in finished:
+                    getter.cancel()
+                    if feeder in finished:
+                        # Surfaces download and decoding errors
+                        feeder.result()
+                    else:
+                        # Fails this job if one of its pieces died with a worker
+                        self._replace_dead()
+                    continue
+                index, segments = getter.result()
+                if isinstance(segments, str):
+                    raise RuntimeError(f"Transcription failed: {segments}")
+                done[index] = segments
+                while next_index in done:
+                    for segment in done.pop(next_index):
+                        yield segment
+                    next_index += 1
+        finally:
+            feeder.cancel()
+            del self._waiting[job_id]
+            # Workers skip whatever is still queued for this job
+            self._finished[job_id % FINISHED_SLOTS] = job_id
+
+    def close(self):
+        for _ in self._workers:
+            self._jobs.put(None)
+        if self._results is not None:
+            self._results.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+        self._workers = []
@@ -0,0 +1,91 @@
+import asyncio
+import io
+import shutil
+import wave
+
+SAMPLE_WIDTH = 2  # LINEAR16
+
+
+def ffmpeg_exe():
+    # moviepy already depends on imageio-ffmpeg, which ships a static build
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return shutil.which("ffmpeg") or "ffmpeg"
+
+
+def wav_to_pcm(data, sample_rate, channels=1):
+    """Strip the RIFF header from a LINEAR16 response and return the samples."""
+    with wave.open(io.BytesIO(data)) as wav:
+        params = (wav.getframerate(), wav.getnchannels(), wav.getsampwidth())
+        if params != (sample_rate, channels, SAMPLE_WIDTH):
+            raise ValueError(f"Unexpected audio format {params}")
+        return wav.readframes(wav.getnframes())
+
+
+class PcmEncoder:
+    """Encode chunks of 16 bit PCM into one file with a single ffmpeg process.
+
+    Chunks may be added in any order; each one is written to the encoder as
+    soon as every chunk before it has arrived, so only out of order chunks
+    are held in memory and nothing touches the disk but the output file.
+    """
+
+    def __init__(self, filename, sample_rate, channels=1, bitrate="64k"):
+        self.filename = str(filename)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bitrate = bitrate
+        self.frames = 0
+        self._pending = {}
+        self._next = 0
+        self._process = None
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    async def __aenter__(self):
+        self._process = await asyncio.create_subprocess_exec(
+            ffmpeg_exe(),
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "s16le",
+            "-ar",
+            str(self.sample_rate),
+            "-ac",
+            str(self.channels),
+            "-i",
+            "pipe:0",
+            "-b:a",
+            self.bitrate,
+            self.filename,
+            stdin=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        return self
+
+    async def add(self, index, pcm):
+        self._pending[index] = pcm
+        while self._next in self._pending:
+            pcm = self._pending.pop(self._next)
+            self._process.stdin.write(pcm)
+            await self._process.stdin.drain()
+            self.frames += len(pcm) // (SAMPLE_WIDTH * self.channels)
+            self._next += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._process.kill()
+            await self._process.wait()
+            return
+        if self._pending:
+            raise RuntimeError(f"Missing audio chunk {self._next}")
+        self._process.stdin.close()
+        _, stderr = await self._process.communicate()
+        if self._process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace')}")
@@ -0,0 +1,221 @@
+import asyncio
+import pickle
+import sqlite3
+import time
+from dataclasses import dataclass, replace
+
+from loguru import logger
+
+# Table the old SqliteDict registry lived in
+LEGACY_TABLE = "unnamed"
+
+
+@dataclass(frozen=True)
+class DomainProfile:
+    domain: str
+    whitelist: bool = False
+    paywall: bool = False
+    count: int = 0
+
+
+class DomainStore:
+    """Per domain whitelist, paywall and article count settings.
+
+    Every row is kept in memory so lookups never touch the disk. Settings
+    are written through, while counts are added up in memory and flushed
+    with ``count = count + ?`` at most every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, path="db.sqlite", flush_interval=30):
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS domains ("
+            " domain TEXT PRIMARY KEY,"
+            " whitelist INTEGER NOT NULL DEFAULT 0,"
+            " paywall INTEGER NOT NULL DEFAULT 0,"
+            " count INTEGER NOT NULL DEFAULT 0"
+            ") WITHOUT ROWID"
+        )
+        # Back the $list filters, ordered the same way as the pages
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS domains_whitelist ON domains (whitelist, domain)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS domains_paywall ON domains (paywall, domain)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS domains_count ON domains (count DESC, domain)"
+        )
+        self._conn.commit()
+        self._migrate()
+        self._profiles = {
+            row[0]: DomainProfile(row[0], bool(row[1]), bool(row[2]), row[3])
+            for row in self._conn.execute(
+                "SELECT domain, whitelist, paywall, count FROM domains"
+            )
+        }
+        self._pending = {}
+        self._flushed = time.monotonic()
+
+    def _migrate(self):
+        # One shot import of the pickled SqliteDict rows, the old table is
+        # renamed rather than dropped so it can be restored by hand
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (LEGACY_TABLE,),
+        ).fetchone()
+        if exists is None:
+            return
+        rows = []
+        for key, value in self._conn.execute(f"SELECT key, value FROM {LEGACY_TABLE}"):
+            profile = pickle.loads(bytes(value))
+            rows.append(
+                (
+                    key,
+                    bool(profile.get("whitelist", False)),
+                    bool(profile.get("paywall", False)),
+                    int(profile.get("count", 0)),
+                )
+            )
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO domains VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                f"ALTER TABLE {LEGACY_TABLE} RENAME TO {LEGACY_TABLE}_migrated"
+            )
+        logger.info(f"Migrated {len(rows)} domains from the SqliteDict registry")
+
+    def __contains__(self, domain):
+        return domain in self._profiles
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def get(self, domain):
+        return self._profiles.get(domain)
+
+    @staticmethod
+    def _where(whitelist, paywall):
+        clauses, params = [], []
+        if whitelist is not None:
+            clauses.append("whitelist = ?")
+            params.append(whitelist)
+        if paywall is not None:
+            clauses.append("paywall = ?")
+            params.append(paywall)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def measure(self, whitelist=None, paywall=None):
+        """Return the number of matching domains and the longest name."""
+        where, params = self._where(whitelist, paywall)
+        rows, widest = self._conn.execute(
+            f"SELECT count(*), max(length(domain)) FROM domains{where}", params
+        ).fetchone()
+        return rows, widest or 0
+
+    def query(self, whitelist=None, paywall=None, by_count=False, limit=20, offset=0):
+        """Return one page of domains matching the filters."""
+        # Include the counts that are still waiting to be written
+        self.flush()
+        where, params = self._where(whitelist, paywall)
+        order = "count DESC, domain" if by_count else "domain"
+        return [
+            DomainProfile(row[0], bool(row[1]), bool(row[2]), row[3])
+            for row in self._conn.execute(
+                "SELECT domain, whitelist, paywall, count FROM domains"
+                f"{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            )
+        ]
+
+    def add(self, domain, whitelist=False, paywall=False):
+        profile = DomainProfile(domain, whitelist, paywall)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO domains VALUES (?, ?, ?, 0)",
+                (domain, whitelist, paywall),
+            )
+        self._pending.pop(domain, None)
+        self._profiles[domain] = profile
+        return profile
+
+    def update(self, domain, **fields):
+        """Change the whitelist and/or paywall setting of ``domain``."""
+        profile = replace(self._profiles[domain], **fields)
+        with self._conn:
+            self._conn.execute(
+                "UPDATE domains SET whitelist = ?, paywall = ? WHERE domain = ?",
+                (profile.whitelist, profile.paywall, domain),
+            )
+        self._profiles[domain] = profile
+        return profile
+
+    def remove(self, domain):
+        with self._conn:
+            self._conn.execute("DELETE FROM domains WHERE domain = ?", (domain,))
+        self._pending.pop(domain, None)
+        del self._profiles[domain]
+
+    def rekey(self, key):
+        """Merge the rows whose domains map to the same ``key(domain)``.
+
+        Merged domains keep the sum of their counts and are whitelisted or
+        paywalled if any of the old rows was.
+        """
+        self.flush()
+        merged = {}
+        for profile in self._profiles.values():
+            domain = key(profile.domain)
+            other = merged.get(domain)
+            if other is None:
+                merged[domain] = replace(profile, domain=domain)
+            else:
+                merged[domain] = DomainProfile(
+                    domain,
+                    other.whitelist or profile.whitelist,
+                    other.paywall or profile.paywall,
+                    other.count + profile.count,
+                )
+        if merged.keys() == self._profiles.keys():
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM domains")
+            self._conn.executemany(
+                "INSERT INTO domains VALUES (?, ?, ?, ?)",
+                [(p.domain, p.whitelist, p.paywall, p.count) for p in merged.values()],
+            )
+        logger.info(f"Merged {len(self._profiles)} domains into {len(merged)}")
+        self._profiles = merged
+
+    def increment(self, domain, amount=1):
+        profile = self._profiles.get(domain)
+        if profile is None:
+            return
+        self._profiles[domain] = replace(profile, count=profile.count + amount)
+        self._pending[domain] = self._pending.get(domain, 0) + amount
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, {}
+        self._flushed = time.monotonic()
+        if not pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE domains SET count = count + ? WHERE domain = ?",
+                [(amount, domain) for domain, amount in pending.items()],
+            )
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
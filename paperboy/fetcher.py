@@ -0,0 +1,147 @@
+import asyncio
+from collections import OrderedDict
+
+import aiohttp
+from loguru import logger
+
+try:
+    import brotli  # noqa: F401 aiohttp decodes br responses when it is installed
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+def default_decode(body, charset=None):
+    return body.decode(charset or "utf-8", errors="replace")
+
+
+class Fetcher:
+    """Keep-alive HTTP client for article pages.
+
+    Connections are pooled across requests with a cap per host, bodies are
+    streamed and abandoned once they pass ``max_size`` and validators from
+    earlier responses are replayed so unchanged pages come back as 304. The
+    pages kept for those replies are capped at ``remembered_size`` characters.
+    ``fetch`` mirrors ``trafilatura.fetch_url`` and returns the decoded page
+    or ``None`` on failure. Bodies are decoded on ``executor``, charset
+    detection on a large page would stall the event loop.
+    """
+
+    def __init__(
+        self,
+        user_agent,
+        limit=32,
+        limit_per_host=4,
+        timeout=30,
+        max_size=10 * 1024**2,
+        decode=None,
+        remembered=64,
+        remembered_size=32 * 1024**2,
+        executor=None,
+    ):
+        self.user_agent = user_agent
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=10)
+        self.max_size = max_size
+        self.decode = decode
+        self.remembered = remembered
+        self.remembered_size = remembered_size
+        self.executor = executor
+        self._validators = OrderedDict()
+        self._validators_size = 0
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    "User-Agent": self.user_agent,
+                    "Accept-Encoding": ACCEPT_ENCODING,
+                },
+            )
+        return self._session
+
+    def _conditional_headers(self, url):
+        headers = {}
+        if url in self._validators:
+            etag, last_modified, _ = self._validators[url]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _forget(self, url):
+        if url in self._validators:
+            self._validators_size -= len(self._validators.pop(url)[2])
+
+    def _remember(self, url, response, text):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        self._forget(url)
+        if (not etag and not last_modified) or len(text) > self.remembered_size:
+            return
+        self._validators[url] = (etag, last_modified, text)
+        self._validators_size += len(text)
+        while (
+            len(self._validators) > self.remembered
+            or self._validators_size > self.remembered_size
+        ):
+            self._forget(next(iter(self._validators)))
+
+    async def _read(self, response):
+        if (response.content_length or 0) > self.max_size:
+            raise ResponseTooLarge(response.content_length)
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            body += chunk
+            if len(body) > self.max_size:
+                raise ResponseTooLarge(len(body))
+        return bytes(body)
+
+    def _decode(self, body, charset):
+        if self.decode is not None:
+            return self.decode(body)
+        return default_decode(body, charset)
+
+    async def fetch(self, url):
+        session = self._get_session()
+        try:
+            async with session.get(
+                url, headers=self._conditional_headers(url)
+            ) as response:
+                if response.status == 304 and url in self._validators:
+                    logger.info(f"Not modified: {url}")
+                    self._validators.move_to_end(url)
+                    return self._validators[url][2]
+                if response.status != 200:
+                    logger.warning(f"Got status {response.status} for {url}")
+                    return None
+                body = await self._read(response)
+                text = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._decode, body, response.charset
+                )
+                self._remember(url, response, text)
+                return text
+        except ResponseTooLarge as e:
+            logger.warning(f"Response for {url} is too large ({e} bytes)")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to fetch {url}: {e!r}")
+        return None
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
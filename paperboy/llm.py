@@ -0,0 +1,170 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+import aiohttp
+from loguru import logger
+from ratelimit import TokenBucket
+from tokens import count_tokens
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Completion budget reserved against the token limit when max_tokens is unset
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+class LLMError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Completion:
+    content: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    tries: int
+
+
+def retry_after(headers):
+    """Seconds to wait according to the response headers, if they say."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP dates are allowed too but the API doesn't send them
+            pass
+    return None
+
+
+class LLMClient:
+    """Async client for OpenAI compatible chat completions.
+
+    One keep-alive session is shared by every call. Requests and prompt
+    plus completion tokens are drawn from per minute buckets before each
+    attempt, a 429 pauses both buckets for the advertised ``retry-after``
+    and the whole call, waits and retries included, is cancelled once
+    ``deadline`` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        base_url="https://api.openai.com/v1",
+        requests_per_minute=3500,
+        tokens_per_minute=90000,
+        deadline=120,
+        max_tries=5,
+        limit=16,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.deadline = deadline
+        self.max_tries = max_tries
+        self.limit = limit
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency": 0.0,
+        }
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+    async def complete(self, messages, model, max_tokens=None, deadline=None):
+        """Return a :class:`Completion` for ``messages``."""
+        start = time.monotonic()
+        try:
+            completion = await asyncio.wait_for(
+                self._complete(messages, model, max_tokens),
+                deadline or self.deadline,
+            )
+        except BaseException:
+            self.stats["failures"] += 1
+            raise
+        completion.latency = time.monotonic() - start
+        self.stats["calls"] += 1
+        self.stats["prompt_tokens"] += completion.prompt_tokens
+        self.stats["completion_tokens"] += completion.completion_tokens
+        self.stats["latency"] += completion.latency
+        logger.info(
+            f"{completion.model} answered in {completion.latency:.1f}s "
+            f"({completion.prompt_tokens} prompt + "
+            f"{completion.completion_tokens} completion tokens, "
+            f"{completion.tries} tries)"
+        )
+        return completion
+
+    async def _complete(self, messages, model, max_tokens):
+        payload = {"model": model, "messages": messages}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        estimate = sum(count_tokens(m["content"], model) + 4 for m in messages)
+        estimate += max_tokens or DEFAULT_COMPLETION_TOKENS
+
+        for tries in range(1, self.max_tries + 1):
+            await self.requests.acquire()
+            await self.tokens.acquire(estimate)
+            try:
+                async with self._get_session().post(
+                    f"{self.base_url}/chat/completions", json=payload
+                ) as response:
+                    if response.status == 200:
+                        body = await response.json()
+                        usage = body.get("usage", {})
+                        return Completion(
+                            content=body["choices"][0]["message"]["content"],
+                            model=body.get("model", model),
+                            prompt_tokens=usage.get("prompt_tokens", 0),
+                            completion_tokens=usage.get("completion_tokens", 0),
+                            latency=0.0,
+                            tries=tries,
+                        )
+                    text = await response.text()
+                    error = LLMError(
+                        f"Completion failed with {response.status}: {text[:200]}",
+                        response.status,
+                    )
+                    if response.status not in RETRY_STATUSES:
+                        raise error
+                    wait = retry_after(response.headers)
+            except aiohttp.ClientError as e:
+                error = LLMError(f"Completion request failed: {e!r}")
+                wait = None
+
+            if tries == self.max_tries:
+                raise error
+            if wait is None:
+                wait = min(30, 2**tries) * random.uniform(0.5, 1)
+            if error.status == 429:
+                # Everyone else would get the same answer, hold them back too
+                self.requests.pause(wait)
+                self.tokens.pause(wait)
+            self.stats["retries"] += 1
+            logger.warning(f"{error}, retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,148 @@
+import bisect
+import contextlib
+import time
+from collections import deque
+
+from aiohttp import web
+from loguru import logger
+
+# Seconds, from a cached lookup up to a long transcription
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+class Histogram:
+    """Cumulative buckets for scraping plus recent samples for percentiles."""
+
+    def __init__(self, buckets=BUCKETS, window=1000):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    pairs = {**dict(labels), **extra}
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(pairs.items()))
+        + "}"
+    )
+
+
+class Metrics:
+    """Counters and latency histograms in the Prometheus text format."""
+
+    def __init__(self, prefix="paperboy"):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self._histograms:
+            self._histograms[key] = Histogram()
+        self._histograms[key].observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, stage, **labels):
+        """Time the block as ``stage``, also when it raises."""
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_failures_total", stage=stage, **labels)
+            raise
+        finally:
+            self.observe(
+                "stage_seconds", time.monotonic() - start, stage=stage, **labels
+            )
+
+    def counters(self):
+        return {
+            f"{name}{_labels(labels)}": value
+            for (name, labels), value in sorted(self._counters.items())
+        }
+
+    def percentiles(self, name="stage_seconds"):
+        """Return ``{labels: (count, p50, p95)}`` over the recent samples."""
+        result = {}
+        for (metric, labels), histogram in sorted(self._histograms.items()):
+            if metric != name:
+                continue
+            labels = dict(labels)
+            label = str(labels.pop("stage", metric))
+            if labels:
+                label += f" ({', '.join(str(value) for value in labels.values())})"
+            result[label] = (
+                histogram.count,
+                histogram.quantile(0.5),
+                histogram.quantile(0.95),
+            )
+        return result
+
+    def render(self):
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self._counters.items()):
+            name = f"{self.prefix}_{name}"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            name = f"{self.prefix}_{name}"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {histogram.count}')
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host="127.0.0.1", port=9100):
+        """Serve ``/metrics`` until the returned runner is cleaned up."""
+
+        async def handler(request):
+            return web.Response(
+                text=self.render(), content_type="text/plain", charset="utf-8"
+            )
+
+        app = web.Application()
+        app.router.add_get("/metrics", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return runner
+
+
+metrics = Metrics()
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from audio import ffmpeg_exe
+
+# Containers whose audio webm can carry without re-encoding
+PASSTHROUGH_AUDIO = {".opus", ".ogg", ".webm"}
+STILL_SECONDS = 60
+STILL_FPS = 4  # Copied frames overshoot the audio by up to one frame
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+async def run_ffmpeg(*args):
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg_exe(),
+        "-loglevel",
+        "error",
+        "-y",
+        *args,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace')}")
+
+
+async def probe_duration(path):
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg_exe(), "-i", str(path), stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    match = DURATION_RE.search(stderr.decode(errors="replace"))
+    if match is None:
+        raise ValueError(f"Couldn't read the duration of {path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class StillMuxer:
+    """Turn an audio file into a webm showing a single image.
+
+    The image is encoded once into a short, low frame rate VP8 track that is
+    cached on disk and looped under each audio file with stream copy, so per
+    video the only encoding work left is the audio, and none at all when the
+    audio is already Opus or Vorbis.
+    """
+
+    def __init__(self, image, cache_dir, audio_bitrate="84k"):
+        self.image = Path(image)
+        self.cache_dir = Path(cache_dir)
+        self.audio_bitrate = audio_bitrate
+        self._lock = asyncio.Lock()
+
+    def _still_path(self):
+        stat = self.image.stat()
+        digest = hashlib.sha256(
+            f"{self.image.resolve()}:{stat.st_size}:{stat.st_mtime}".encode()
+        ).hexdigest()[:16]
+        return self.cache_dir / f"still-{digest}.webm"
+
+    async def still_track(self):
+        async with self._lock:
+            path = self._still_path()
+            if not path.exists():
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"tmp-{path.name}")
+                await run_ffmpeg(
+                    "-loop",
+                    "1",
+                    "-framerate",
+                    str(STILL_FPS),
+                    "-i",
+                    str(self.image),
+                    "-t",
+                    str(STILL_SECONDS),
+                    "-vf",
+                    "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+                    "-c:v",
+                    "libvpx",
+                    "-crf",
+                    "10",
+                    "-b:v",
+                    "1M",
+                    "-g",
+                    str(STILL_SECONDS * STILL_FPS),
+                    "-pix_fmt",
+                    "yuv420p",
+                    str(tmp_path),
+                )
+                tmp_path.replace(path)
+            return path
+
+    async def still_bitrate(self):
+        """Bits per second the looped still adds to every video."""
+        path = await self.still_track()
+        return path.stat().st_size * 8 / STILL_SECONDS
+
+    async def make_video(self, audio, duration=None):
+        audio = Path(audio)
+        filename = audio.with_suffix(".webm")
+        if duration is None:
+            duration = await probe_duration(audio)
+        if audio.suffix in PASSTHROUGH_AUDIO:
+            audio_codec = ["-c:a", "copy"]
+        else:
+            audio_codec = ["-c:a", "libopus", "-b:a", self.audio_bitrate]
+        await run_ffmpeg(
+            "-stream_loop",
+            "-1",
+            "-i",
+            str(await self.still_track()),
+            "-i",
+            str(audio),
+            "-map",
+            "0:v:0",
+            "-map",
+            "1:a:0",
+            "-c:v",
+            "copy",
+            *audio_codec,
+            "-t",
+            f"{duration + 0.1:.3f}",
+            str(filename),
+        )
+        return str(filename), timedelta(seconds=duration)
+
+    async def make_parts(self, audio, duration, parts):
+        """Cut ``audio`` into ``parts`` equal videos without re-encoding it.
+
+        Opus and Vorbis are cut with stream copy at packet boundaries, then each
+        piece gets the still like ``make_video`` and is deleted.
+        """
+        audio = Path(audio)
+        length = duration / parts
+        videos = []
+        for i in range(parts):
+            piece = audio.with_name(f"{audio.stem}-part{i + 1}{audio.suffix}")
+            await run_ffmpeg(
+                "-ss",
+                f"{i * length:.3f}",
+                "-t",
+                f"{length:.3f}",
+                "-i",
+                str(audio),
+                "-c:a",
+                "copy",
+                str(piece),
+            )
+            # The last piece ends wherever the audio does
+            videos.append(await self.make_video(piece, None))
+            piece.unlink()
+        return videos
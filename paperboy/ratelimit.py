@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket refilled at ``rate`` tokens per second.
+
+    Waiters are served in arrival order. A request larger than the bucket
+    waits for a full bucket and leaves it in debt, so oversized requests
+    still get through at the configured average rate.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def tokens(self):
+        self._refill()
+        return self._tokens
+
+    def pause(self, seconds):
+        """Hold every acquisition for ``seconds``, e.g. after a 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while (delay := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            needed = min(tokens, self.capacity)
+            self._refill()
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from loguru import logger
+from urls import canonical_url
+
+INDEX_NAME = ".cache.sqlite"
+
+
+class ResultCache:
+    """Finished pipeline results keyed by canonical URL.
+
+    Results are stored as JSON next to the list of files they point at, so
+    a repost can be answered straight from disk. The cache also owns the
+    size of ``directory``: expired results, results with missing files and,
+    once ``quota`` bytes are exceeded, the least recently used results and
+    stray files are deleted. Stray files younger than ``grace`` seconds are
+    left alone, they belong to jobs that haven't called ``put`` yet.
+    Eviction scans the whole directory, ``evict_periodically`` runs it every
+    ``evict_interval`` seconds on an executor rather than on every ``put``.
+    """
+
+    def __init__(
+        self,
+        directory,
+        ttl=7 * 24 * 3600,
+        quota=2 * 1024**3,
+        grace=3600,
+        evict_interval=300,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.quota = quota
+        self.grace = grace
+        self.evict_interval = evict_interval
+        self._conn = sqlite3.connect(self.directory / INDEX_NAME)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " url TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " files TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " ttl REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "ttl" not in columns:
+            # Indexes from before results could have their own lifetime
+            self._conn.execute("ALTER TABLE results ADD COLUMN ttl REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def file_key(url):
+        """Name for the files of ``url``, unique per canonical URL."""
+        return hashlib.sha256(canonical_url(url).encode()).hexdigest()[:16]
+
+    def get(self, url):
+        key = canonical_url(url)
+        row = self._conn.execute(
+            "SELECT payload, files, created, ttl FROM results WHERE url = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        payload, files, created, ttl = row
+        if time.time() - created > (ttl or self.ttl) or not all(
+            Path(f).exists() for f in json.loads(files)
+        ):
+            self._delete(key, json.loads(files))
+            return None
+        self._conn.execute(
+            "UPDATE results SET accessed = ? WHERE url = ?", (time.time(), key)
+        )
+        self._conn.commit()
+        return json.loads(payload)
+
+    def put(self, url, payload, files, ttl=None):
+        """Store ``payload``, reused for ``ttl`` seconds or the cache's default."""
+        key = canonical_url(url)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results"
+            " (url, payload, files, created, accessed, ttl)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                json.dumps(payload),
+                json.dumps([str(f) for f in files]),
+                now,
+                now,
+                ttl,
+            ),
+        )
+        self._conn.commit()
+
+    def _delete(self, key, files, conn=None):
+        logger.info(f"Evicting cached result for {key}")
+        for f in files:
+            Path(f).unlink(missing_ok=True)
+        conn = conn or self._conn
+        conn.execute("DELETE FROM results WHERE url = ?", (key,))
+        conn.commit()
+
+    def evict(self):
+        """Drop expired results, then trim ``directory`` down to ``quota``.
+
+        Uses its own connection so it can run on any thread.
+        """
+        conn = sqlite3.connect(self.directory / INDEX_NAME)
+        try:
+            self._evict(conn)
+        finally:
+            conn.close()
+
+    async def evict_periodically(self, executor=None):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            try:
+                await loop.run_in_executor(executor, self.evict)
+            except Exception:
+                logger.exception("Evicting cached results failed")
+
+    def _evict(self, conn):
+        now = time.time()
+        entries = []
+        owned = set()
+        for key, files, created, accessed, ttl in conn.execute(
+            "SELECT url, files, created, accessed, ttl FROM results"
+        ).fetchall():
+            files = json.loads(files)
+            if now - created > (ttl or self.ttl):
+                self._delete(key, files, conn)
+                continue
+            owned.update(Path(f).resolve() for f in files)
+            size = sum(Path(f).stat().st_size for f in files if Path(f).exists())
+            entries.append((accessed, size, key, files))
+
+        # Files nobody references compete on their modification time
+        for path in self.directory.iterdir():
+            if path.name.startswith(INDEX_NAME) or not path.is_file():
+                continue
+            if path.resolve() not in owned:
+                stat = path.stat()
+                if now - stat.st_mtime < self.grace:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, None, [path]))
+
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, key, files in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.quota:
+                break
+            if key is None:
+                logger.info(f"Evicting stray file {files[0]}")
+                files[0].unlink(missing_ok=True)
+            else:
+                self._delete(key, files, conn)
+            total -= size
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,141 @@
+import asyncio
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+DEFAULT_STAGE_LIMITS = {
+    "fetch": 4,
+    "extract": 2,
+    "summarize": 4,
+    "transcribe": 1,
+    "tts": 2,
+    "video": 1,
+    "upload": 2,
+}
+
+
+class JobScheduler:
+    """Bounded job queue with a concurrency cap for every pipeline stage.
+
+    Jobs are coroutine factories pulled off the queue by a fixed number of
+    workers. Inside a job each stage is entered through ``stage`` or ``run``
+    so that, for example, only one video encode runs at a time no matter
+    how many articles are in flight.
+    """
+
+    def __init__(self, workers=2, max_queue=50, stage_limits=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.stage_limits = {**DEFAULT_STAGE_LIMITS, **(stage_limits or {})}
+        self._queue = None
+        self._tasks = []
+        self._semaphores = {}
+        self._running = Counter()
+        self._waiting = Counter()
+        self._active = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(self.stage_limits.values()),
+            thread_name_prefix="paperboy",
+        )
+
+    @property
+    def depth(self):
+        """Number of jobs waiting for a free worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def saturated(self):
+        return self._active + self.depth >= self.workers
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [task for task in self._tasks if not task.done()]
+        for _ in range(self.workers - len(self._tasks)):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def submit(self, job, name="job"):
+        """Queue ``job`` and return its position, 0 if a worker is free.
+
+        Waits while the queue is full, which pushes back on the caller.
+        """
+        self._ensure_started()
+        await self._queue.put((name, job))
+        # No await between the put and this, concurrent submits get their own
+        position = max(0, self._active + self.depth - self.workers)
+        logger.info(f"Queued {name} (depth {self.depth}, position {position})")
+        return position
+
+    async def _worker(self):
+        while True:
+            name, job = await self._queue.get()
+            self._active += 1
+            try:
+                await job()
+            except Exception:
+                logger.exception(f"Job {name} failed")
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+
+    def _semaphore(self, stage):
+        if stage not in self._semaphores:
+            limit = self.stage_limits.get(stage, 1)
+            self._semaphores[stage] = asyncio.Semaphore(limit)
+        return self._semaphores[stage]
+
+    @asynccontextmanager
+    async def stage(self, stage):
+        """Hold one of the slots of ``stage`` for the duration of the block."""
+        self._waiting[stage] += 1
+        try:
+            await self._semaphore(stage).acquire()
+        finally:
+            self._waiting[stage] -= 1
+        self._running[stage] += 1
+        try:
+            yield
+        finally:
+            self._running[stage] -= 1
+            self._semaphore(stage).release()
+
+    @property
+    def executor(self):
+        return self._executor
+
+    async def run(self, stage, func, *args, **kwargs):
+        """Run blocking ``func`` on the scheduler's executor within ``stage``."""
+        async with self.stage(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    def snapshot(self):
+        return {
+            "depth": self.depth,
+            "active": self._active,
+            "workers": self.workers,
+            "stages": {
+                stage: (self._running[stage], self._waiting[stage], limit)
+                for stage, limit in self.stage_limits.items()
+            },
+        }
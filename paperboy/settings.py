@@ -1,3 +1,5 @@
+import os
+
 from pydantic import BaseSettings
 from system_message import system_message
 
@@ -8,9 +10,47 @@ class Settings(BaseSettings):
     channels = [int]
     message_lifetime: int = 60  # Default to 60 seconds or 1 minute
     selenium_url: str = "http://selenium:4444/wd/hub"
+    selenium_pool_size: int = 2
+    selenium_max_uses: int = 20  # Pages served before a session is replaced
+    selenium_max_age: int = 1800  # Seconds before a session is replaced
     openai_api_key: str
+    # Summaries go to the small model when the prompt and answer fit in it
+    openai_small_model: str = "gpt-3.5-turbo"
+    openai_small_context: int = 4096
+    openai_small_max_tokens: int = 512
     openai_model: str = "gpt-3.5-turbo-16k"
+    openai_context: int = 16384
+    openai_max_tokens: int = 1024
+    openai_base_url: str = "https://api.openai.com/v1"
+    openai_requests_per_minute: int = 3500
+    openai_tokens_per_minute: int = 180000
+    openai_timeout: int = 90  # Seconds for one completion, retries included
+    summary_chunk_tokens: int = 8000  # Longer texts are summarized in parts
+    summary_concurrency: int = 4
+    progressive_summary: bool = True  # Post an extractive summary, then edit in
+    summary_latency_budget: int = 120  # Seconds to wait for the LLM summary
     system_message: str = system_message
+    fetch_limit_per_host: int = 4
+    fetch_timeout: int = 30  # Seconds for a whole article download
+    fetch_max_size: int = 10 * 1024**2  # Bytes
+    fetch_remembered_size: int = 32 * 1024**2  # Characters of pages kept for 304s
+    tts_cache_dir: str = "./articles/.tts_cache"
+    tts_cache_size: int = 512 * 1024**2  # Bytes
+    tts_requests_per_minute: int = 300
+    tts_concurrency: int = 4
+    whisper_model: str = "small.en"
+    # Whisper workers transcribing pieces in parallel, they share the cores
+    asr_processes: int = max(1, min(4, (os.cpu_count() or 1) // 4))
+    asr_segment_seconds: int = 120  # Audio is split at silences near this length
+    workers: int = 2
+    max_queue: int = 50
+    stage_limits: dict = {}
+    result_cache_ttl: int = 7 * 24 * 3600  # Seconds a finished result is reused
+    result_cache_quota: int = 2 * 1024**3  # Bytes allowed in ./articles
+    result_cache_evict_interval: int = 300  # Seconds between quota checks
+    fallback_summary_ttl: int = 3600  # Reuse of results whose LLM summary failed
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0  # Serve Prometheus metrics on this port, 0 to disable
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,41 @@
+import asyncio
+
+from loguru import logger
+
+
+class SingleFlight:
+    """Registry of keys that have a job queued or running.
+
+    The first caller ``claim``s a key and must ``release`` it when the job
+    is done, whether it worked or not. Everyone else asking for the same
+    key in the meantime can ``wait`` for that job instead of starting a
+    second one.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    def __len__(self):
+        return len(self._flights)
+
+    def claim(self, key):
+        """Register ``key`` as in flight, False if it already was."""
+        if key in self._flights:
+            return False
+        self._flights[key] = asyncio.get_running_loop().create_future()
+        return True
+
+    def release(self, key):
+        flight = self._flights.pop(key, None)
+        if flight is not None and not flight.done():
+            flight.set_result(None)
+
+    async def wait(self, key):
+        flight = self._flights.get(key)
+        if flight is not None:
+            logger.info(f"Waiting for the job already running for {key}")
+            # A cancelled waiter must not cancel the flight for the others
+            await asyncio.shield(flight)
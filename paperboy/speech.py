@@ -0,0 +1,129 @@
+import asyncio
+
+import backoff
+from audio import PcmEncoder, wav_to_pcm
+from loguru import logger
+from metrics import metrics
+from ratelimit import TokenBucket
+from settings import settings
+from tts_cache import ChunkCache
+
+SAMPLE_RATE = 24000
+
+
+def retryable(e):
+    # The Google client libraries are slow to import, load them with the first article
+    from google.api_core import exceptions
+
+    return isinstance(
+        e,
+        (
+            exceptions.ResourceExhausted,
+            exceptions.ServiceUnavailable,
+            exceptions.DeadlineExceeded,
+            exceptions.InternalServerError,
+        ),
+    )
+
+
+chunk_cache = ChunkCache(settings.tts_cache_dir, max_bytes=settings.tts_cache_size)
+limiter = TokenBucket(
+    settings.tts_requests_per_minute / 60, capacity=settings.tts_concurrency
+)
+_client = None
+
+
+def get_client():
+    # The client holds a gRPC channel, share it between articles
+    global _client
+    if _client is None:
+        import google.cloud.texttospeech as tts
+
+        _client = tts.TextToSpeechAsyncClient()
+    return _client
+
+
+def backoff_hdlr(details):
+    logger.warning(
+        "Retrying TTS chunk in {wait:0.1f} seconds after {tries} tries".format(
+            **details
+        )
+    )
+
+
+@backoff.on_exception(
+    backoff.expo,
+    Exception,
+    giveup=lambda e: not retryable(e),
+    max_tries=5,
+    max_value=30,
+    on_backoff=backoff_hdlr,
+)
+async def request_speech(text_input, voice_params, audio_config):
+    await limiter.acquire()
+    response = await get_client().synthesize_speech(
+        input=text_input, voice=voice_params, audio_config=audio_config
+    )
+    return response.audio_content
+
+
+async def synthesize_chunk(text, voice_params, audio_config):
+    key = chunk_cache.key(
+        text.encode(),
+        type(voice_params).serialize(voice_params),
+        type(audio_config).serialize(audio_config),
+    )
+    audio = await asyncio.to_thread(chunk_cache.get, key)
+    metrics.inc("tts_cache_total", result="miss" if audio is None else "hit")
+    if audio is not None:
+        return audio
+
+    import google.cloud.texttospeech as tts
+
+    text_input = tts.SynthesisInput(text=text)
+    with metrics.timer("tts_chunk"):
+        audio = await request_speech(text_input, voice_params, audio_config)
+    await asyncio.to_thread(chunk_cache.put, key, audio)
+    return audio
+
+
+async def text_to_speech(
+    filename: str, chunked_text: [str], progress=None, bitrate="64k"
+):
+    import google.cloud.texttospeech as tts
+
+    voice_params = tts.VoiceSelectionParams(
+        language_code="en-US", name="en-US-Wavenet-I"
+    )
+    audio_config = tts.AudioConfig(
+        audio_encoding=tts.AudioEncoding.LINEAR16, sample_rate_hertz=SAMPLE_RATE
+    )
+    semaphore = asyncio.Semaphore(settings.tts_concurrency)
+    done = 0
+
+    async with PcmEncoder(filename, SAMPLE_RATE, bitrate=bitrate) as encoder:
+
+        async def render(i, text):
+            nonlocal done
+            async with semaphore:
+                audio = await synthesize_chunk(text, voice_params, audio_config)
+            await encoder.add(i, wav_to_pcm(audio, SAMPLE_RATE))
+            done += 1
+            logger.info(f"Recorded chunk {i + 1} ({done}/{len(chunked_text)})")
+            if progress is not None:
+                await progress(done, len(chunked_text))
+
+        tasks = [
+            asyncio.create_task(render(i, text)) for i, text in enumerate(chunked_text)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop spending TTS quota on an article that already failed, and
+            # don't let the others write to ffmpeg once the encoder is killed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    logger.info(f"TTS chunk cache {chunk_cache.stats()}")
+    return encoder.duration
@@ -1,45 +1,145 @@
 import asyncio
+import functools
+from dataclasses import dataclass
 from textwrap import shorten
 
-import openai
 import pysrt
+from llm import LLMClient
+from loguru import logger
 from settings import settings
-from sumy.nlp.stemmers import Stemmer
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.summarizers.lsa import LsaSummarizer as Summarizer
-from sumy.utils import get_stop_words
+from text_processing import pack_sentences, split_sentences
+from tokens import count_tokens
 
 LANGUAGE = "english"
 SENTENCES_COUNT = 5
 
 
-async def new_summarize(text):
-    openai.api_key = settings.openai_api_key
+client = LLMClient(
+    settings.openai_api_key,
+    base_url=settings.openai_base_url,
+    requests_per_minute=settings.openai_requests_per_minute,
+    tokens_per_minute=settings.openai_tokens_per_minute,
+    deadline=settings.openai_timeout,
+)
+
+
+@dataclass(frozen=True)
+class Tier:
+    model: str
+    context: int
+    max_tokens: int
+
+
+TIERS = [
+    Tier(
+        settings.openai_small_model,
+        settings.openai_small_context,
+        settings.openai_small_max_tokens,
+    ),
+    Tier(settings.openai_model, settings.openai_context, settings.openai_max_tokens),
+]
+
+
+def route(messages, tiers=TIERS):
+    """Pick the first tier whose context fits the prompt and the answer."""
+    prompt_tokens = sum(count_tokens(m["content"], tiers[-1].model) for m in messages)
+    # Every message carries a few tokens of chat formatting
+    prompt_tokens += 4 * len(messages)
+    for tier in tiers:
+        if prompt_tokens + tier.max_tokens <= tier.context:
+            break
+    else:
+        # new_summarize packs its parts to fit, this is a bug upstream
+        logger.warning(
+            f"{prompt_tokens} prompt tokens overflow every tier, "
+            f"sending them to {tier.model} anyway"
+        )
+    logger.info(
+        f"Routing {prompt_tokens} prompt tokens to {tier.model} "
+        f"(context {tier.context}, max_tokens {tier.max_tokens})"
+    )
+    return tier
+
+
+async def complete(messages):
+    tier = route(messages)
+    completion = await client.complete(messages, tier.model, tier.max_tokens)
+    return completion.content
+
+
+async def summarize_part(text, index, total):
     messages = [
         {"role": "system", "content": settings.system_message},
-        {"role": "user", "content": text},
+        {
+            "role": "user",
+            "content": f"This is part {index} of {total} of a longer text.\n\n{text}",
+        },
     ]
-    loop = asyncio.get_event_loop()
-    response = await loop.run_in_executor(
-        None,
-        lambda: openai.ChatCompletion.create(
-            model=settings.openai_model, messages=messages
-        ),
+    return await complete(messages)
+
+
+async def new_summarize(text):
+    if count_tokens(text, settings.openai_model) <= settings.summary_chunk_tokens:
+        messages = [
+            {"role": "system", "content": settings.system_message},
+            {"role": "user", "content": text},
+        ]
+        return await complete(messages)
+
+    # Map: summarize sentence aligned parts concurrently
+    def split(text):
+        return pack_sentences(
+            split_sentences(text),
+            settings.summary_chunk_tokens,
+            size=lambda sentence: count_tokens(sentence, settings.openai_model),
+        )
+
+    parts = await asyncio.to_thread(split, text)
+    logger.info(f"Summarizing {len(parts)} parts")
+    semaphore = asyncio.Semaphore(settings.summary_concurrency)
+
+    async def bounded(index, part):
+        async with semaphore:
+            return await summarize_part(part, index, len(parts))
+
+    summaries = await asyncio.gather(
+        *[bounded(index, part) for index, part in enumerate(parts, start=1)]
+    )
+
+    # Reduce: the partial summaries are summarized like a text of their own
+    return await new_summarize(
+        "Summaries of consecutive parts of one text:\n\n" + "\n\n".join(summaries)
     )
-    ai_message = response["choices"][0]["message"]["content"]
-    return ai_message
+
+
+@functools.lru_cache(maxsize=None)
+def _tokenizer(language):
+    # sumy pulls in all of nltk, import it with the first summary
+    from sumy.nlp.tokenizers import Tokenizer
+
+    return Tokenizer(language)
+
+
+@functools.lru_cache(maxsize=None)
+def _summarizer(language):
+    from sumy.nlp.stemmers import Stemmer
+    from sumy.summarizers.lsa import LsaSummarizer as Summarizer
+    from sumy.utils import get_stop_words
+
+    # Loading the stemmer and stop words is the slow part, do it once
+    summarizer = Summarizer(Stemmer(language))
+    summarizer.stop_words = get_stop_words(language)
+    return summarizer
 
 
 def _summarize(text, sentences=SENTENCES_COUNT, language=LANGUAGE):
-    parser = PlaintextParser.from_string(text, Tokenizer(language))
-    stemmer = Stemmer(LANGUAGE)
+    from sumy.parsers.plaintext import PlaintextParser
 
-    summarizer = Summarizer(stemmer)
-    summarizer.stop_words = get_stop_words(LANGUAGE)
+    parser = PlaintextParser.from_string(text, _tokenizer(language))
+    summarizer = _summarizer(language)
 
     return shorten(
-        " ".join([str(s) for s in summarizer(parser.document, SENTENCES_COUNT)]),
+        " ".join([str(s) for s in summarizer(parser.document, sentences)]),
         width=1800,
         placeholder="...",
     )
@@ -1,26 +1,102 @@
 import textwrap
 from datetime import datetime
 
-MAX_CHUNK = 4900
+from loguru import logger
+
+# Google TTS rejects requests whose text is over 5000 bytes
+MAX_CHUNK = 5000
+
+
+def punkt_resource():
+    """The punkt data the installed nltk loads, 3.9 switched to punkt_tab."""
+    from nltk.tokenize import punkt
+
+    return "punkt_tab" if hasattr(punkt, "PunktTokenizer") else "punkt"
+
+
+def check_nltk_data():
+    """Warn when the punkt data is missing, it is bundled and never downloaded."""
+    import nltk
+
+    resource = punkt_resource()
+    try:
+        nltk.data.find(f"tokenizers/{resource}")
+    except LookupError:
+        logger.warning(
+            f"NLTK {resource} data not found, "
+            f"run `python -m nltk.downloader {resource}`"
+        )
+        return False
+    return True
+
+
+def split_sentences(text):
+    # nltk takes a while to import, only load it with the first article
+    import nltk
+
+    return [
+        sentence
+        for paragraph in text.split("\n")
+        for sentence in nltk.sent_tokenize(paragraph)
+    ]
+
+
+def utf8_size(text):
+    return len(text.encode())
+
+
+def split_word(word, limit, size=len):
+    """Split a single word that is larger than ``limit`` between characters."""
+    pieces = []
+    start = 0
+    used = 0
+    for i, char in enumerate(word):
+        char_size = size(char)
+        if used + char_size > limit and i > start:
+            pieces.append(word[start:i])
+            start = i
+            used = 0
+        used += char_size
+    pieces.append(word[start:])
+    return pieces
+
+
+def pack_sentences(sentences, limit, size=len):
+    """Group consecutive sentences into chunks whose ``size`` stays in ``limit``.
+
+    A sentence that is larger than ``limit`` on its own is split between words,
+    and a word larger than ``limit`` between characters.
+    """
+    chunks = []
+    current = []
+    current_size = 0
+    for sentence in sentences:
+        sentence_size = size(sentence)
+        if sentence_size > limit:
+            if current:
+                chunks.append(" ".join(current))
+            words = sentence.split()
+            if len(words) > 1:
+                chunks.extend(pack_sentences(words, limit, size))
+            else:
+                chunks.extend(split_word(sentence, limit, size))
+            current = []
+            current_size = 0
+            continue
+        if current and current_size + sentence_size > limit:
+            chunks.append(" ".join(current))
+            current = []
+            current_size = 0
+        current.append(sentence)
+        current_size += sentence_size + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
 
 
 async def process_text(text):
-    wrapper = textwrap.TextWrapper()
-    wrapper.width = 120
-    wrapper.fix_sentence_endings = True
-    wrapper.break_long_words = False
-    wrapper.break_on_hyphens = False
-    formatted = []
-    for t in text.split("\n"):
-        formatted.append("\n".join(wrapper.wrap(t)))
-
-    chunked = [""]
-    for f in formatted:
-        if len(chunked[-1]) + len(f"{f}\n") < MAX_CHUNK:
-            chunked[-1] = chunked[-1] + f"{f}\n"
-        else:
-            chunked.append(f)
-    return chunked
+    """Split ``text`` into as few chunks of whole sentences as fit one TTS request."""
+    return pack_sentences(split_sentences(text), MAX_CHUNK, size=utf8_size)
 
 
 async def format_article(title, text, author=None, date=datetime.min, width=120):
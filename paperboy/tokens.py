@@ -0,0 +1,33 @@
+import functools
+
+from loguru import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough English average, used when tiktoken or its encodings are unavailable
+CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encodings are downloaded on first use
+        logger.warning(f"Counting tokens by length, tiktoken unavailable: {e!r}")
+        return None
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+
+class ChunkCache:
+    """Synthesized audio stored on disk under a hash of what produced it.
+
+    The least recently used entries are deleted once the cache holds more
+    than ``max_bytes``. Recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024**2):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        # get and put run in worker threads
+        self._lock = threading.Lock()
+        files = [path for path in self.directory.iterdir() if path.suffix == ".bin"]
+        for path in sorted(files, key=lambda path: path.stat().st_mtime):
+            self._entries[path.stem] = path.stat().st_size
+            self._size += path.stat().st_size
+
+    @staticmethod
+    def key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            # Length prefix so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / f"{key}.bin"
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                self._size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            os.utime(path)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        # Identical chunks can be written at the same time
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        with self._lock:
+            tmp_path.replace(path)
+            self._size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self._size -= size
+            logger.debug(f"Evicted TTS chunk {key}")
+
+    @property
+    def size(self):
+        return self._size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
@@ -0,0 +1,55 @@
+import math
+from dataclasses import dataclass
+
+# Discord's attachment limit for servers without boosts and for DMs
+DEFAULT_LIMIT = 10 * 1024**2
+# Opus audio bitrates to try in kbit/s, speech is still clear at 16k
+BITRATES = (64, 48, 32, 24, 16)
+# Roughly how fast the Wavenet voices read
+CHARS_PER_SECOND = 15
+# Ogg and WebM framing on top of the raw streams
+CONTAINER_OVERHEAD = 0.03
+
+
+@dataclass(frozen=True)
+class UploadPlan:
+    bitrate: int
+    parts: int
+    predicted_size: int
+
+    @property
+    def audio_bitrate(self):
+        return f"{self.bitrate}k"
+
+
+def upload_limit(message):
+    guild = getattr(message, "guild", None)
+    return getattr(guild, "filesize_limit", None) or DEFAULT_LIMIT
+
+
+def estimate_duration(chunks):
+    """Seconds of speech the TTS voice will make of ``chunks``."""
+    return sum(len(chunk) for chunk in chunks) / CHARS_PER_SECOND
+
+
+def predict_size(duration, bitrate, video_bitrate=0):
+    """Bytes of a video with ``bitrate`` kbit/s audio and a ``video_bitrate`` still."""
+    bits_per_second = bitrate * 1000 + video_bitrate
+    return math.ceil(duration * bits_per_second / 8 * (1 + CONTAINER_OVERHEAD))
+
+
+def parts_needed(size, limit, headroom=0.9):
+    return max(1, math.ceil(size / (limit * headroom)))
+
+
+def plan_upload(duration, limit, video_bitrate=0, bitrates=BITRATES, headroom=0.9):
+    """Pick the highest audio bitrate whose video fits in one upload.
+
+    Durations are estimates, ``headroom`` keeps some of the limit spare. When
+    even the lowest bitrate is too large the video is split into parts.
+    """
+    for bitrate in bitrates:
+        size = predict_size(duration, bitrate, video_bitrate)
+        if size <= limit * headroom:
+            return UploadPlan(bitrate, 1, size)
+    return UploadPlan(bitrate, parts_needed(size, limit, headroom), size)
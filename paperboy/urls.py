@@ -0,0 +1,77 @@
+import functools
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from courlan import normalize_url, scrub_url
+from tld import get_fld
+
+# Query parameters that only say where a link was shared from
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "igshid",
+        "mkt_tok",
+        "ref_src",
+        "ref_url",
+        "smid",
+        "si",
+        "feature",
+        "cmpid",
+        "ocid",
+        "_ga",
+    }
+)
+TRACKING_PREFIXES = ("utm_", "mc_", "pk_", "hsa_", "vero_")
+
+
+def strip_tracking(url):
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    pairs = parse_qsl(parts.query, keep_blank_values=True)
+    query = [
+        (key, value)
+        for key, value in pairs
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    if len(query) == len(pairs):
+        return url
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def canonical_url(url):
+    """Normalize ``url`` so that trivially different links compare equal."""
+    parsed = normalize_url(strip_tracking(scrub_url(url)))
+    return parsed.split("#", 1)[0]
+
+
+@functools.lru_cache(maxsize=4096)
+def registered_domain(host):
+    """Map a host to the domain it was registered under, www.bbc.co.uk -> bbc.co.uk"""
+    host = host.lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    return get_fld(host, fix_protocol=True, fail_silently=True) or host
+
+
+@functools.lru_cache(maxsize=None)
+def _extractor():
+    # URLExtract loads and compiles its TLD list on creation, only do it once
+    from urlextract import URLExtract
+
+    return URLExtract()
+
+
+def find_urls(text):
+    """Return the canonical http(s) links in ``text`` in order, without repeats.
+
+    Bare domain names are skipped, only links with a scheme are taken.
+    """
+    urls = {}
+    for candidate in _extractor().find_urls(text, only_unique=True):
+        parts = urlsplit(candidate)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            continue
+        urls.setdefault(canonical_url(candidate), None)
+    return list(urls)
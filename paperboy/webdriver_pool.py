@@ -0,0 +1,144 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+
+class PooledDriver:
+    def __init__(self, driver, slot):
+        self.driver = driver
+        self.slot = slot
+        self.created = time.monotonic()
+        self.uses = 0
+
+
+class WebDriverPool:
+    """Warm WebDriver sessions handed out to coroutines.
+
+    ``factory`` is a blocking callable that takes a profile directory and
+    returns a started driver. Every slot of the pool owns its own profile
+    directory so concurrent sessions never share Chrome's user data. A
+    session is health checked when it is checked out and replaced once it
+    has served ``max_uses`` pages or is older than ``max_age`` seconds.
+    """
+
+    def __init__(
+        self, factory, size=2, max_uses=20, max_age=1800, profile_root="/tmp/chrome"
+    ):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.profile_root = profile_root
+        # Created on first use, the pool is built at import before the loop runs
+        self._idle = None
+        self._free_slots = list(range(size))
+
+    def _idle_queue(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        return self._idle
+
+    def _profile_dir(self, slot):
+        return f"{self.profile_root}-{slot}"
+
+    async def _create(self, slot):
+        logger.info(f"Starting WebDriver session in slot {slot}")
+        driver = await asyncio.to_thread(self.factory, self._profile_dir(slot))
+        return PooledDriver(driver, slot)
+
+    async def _discard(self, pooled):
+        logger.info(f"Recycling WebDriver session in slot {pooled.slot}")
+        try:
+            await asyncio.to_thread(pooled.driver.quit)
+        except Exception:
+            logger.exception("Failed to quit WebDriver session")
+
+    def _expired(self, pooled):
+        return (
+            pooled.uses >= self.max_uses
+            or time.monotonic() - pooled.created >= self.max_age
+        )
+
+    async def _healthy(self, pooled):
+        try:
+            await asyncio.to_thread(lambda: pooled.driver.current_url)
+        except Exception:
+            logger.warning(f"WebDriver session in slot {pooled.slot} is unhealthy")
+            return False
+        return True
+
+    def _release_slot(self, slot):
+        self._free_slots.append(slot)
+        # Wake up a coroutine waiting for an idle session so it uses the slot
+        self._idle_queue().put_nowait(None)
+
+    async def start(self):
+        """Pre-start sessions for every free slot."""
+        slots, self._free_slots = self._free_slots, []
+        results = await asyncio.gather(
+            *[self._create(slot) for slot in slots], return_exceptions=True
+        )
+        for slot, result in zip(slots, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    f"Failed to start WebDriver session in slot {slot}"
+                )
+                self._free_slots.append(slot)
+            else:
+                self._idle_queue().put_nowait(result)
+
+    async def _checkout(self):
+        while True:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                # BaseException so a cancelled job gives the slot back too
+                try:
+                    return await self._create(slot)
+                except BaseException:
+                    self._release_slot(slot)
+                    raise
+            pooled = await self._idle_queue().get()
+            if pooled is None:
+                continue
+            try:
+                usable = not self._expired(pooled) and await self._healthy(pooled)
+            except BaseException:
+                self._idle_queue().put_nowait(pooled)
+                raise
+            if usable:
+                return pooled
+            try:
+                await self._discard(pooled)
+            finally:
+                self._free_slots.append(pooled.slot)
+
+    def _checkin(self, pooled):
+        pooled.uses += 1
+        self._idle_queue().put_nowait(pooled)
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a driver, waiting without blocking the loop if none is free."""
+        pooled = await self._checkout()
+        try:
+            yield pooled.driver
+        except BaseException:
+            # The page may have left the browser in a bad state, and cancelled
+            # jobs must still free their slot
+            try:
+                await self._discard(pooled)
+            finally:
+                self._release_slot(pooled.slot)
+            raise
+        else:
+            self._checkin(pooled)
+
+    async def close(self):
+        while not self._idle_queue().empty():
+            pooled = self._idle_queue().get_nowait()
+            if pooled is None:
+                continue
+            await self._discard(pooled)
+            self._free_slots.append(pooled.slot)
@@ -1,25 +1,40 @@
 import asyncio
 import io
 import re
-import tempfile
 from textwrap import wrap
 from typing import Iterator
 from urllib.parse import parse_qs, urlparse
 
-import pytube
-import whisper
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
+import aiohttp
+from asr_worker import AsrPool, stream_audio
+from loguru import logger
+from settings import settings
+from sqlitedict import SqliteDict
 
-# Load Whisper model
-model = whisper.load_model("small.en")
+CAPTION_LANGUAGES = ["en", "en-US", "en-GB"]
+
+# Whisper runs in worker processes that start with the first video
+asr = AsrPool(
+    settings.whisper_model,
+    processes=settings.asr_processes,
+    segment_seconds=settings.asr_segment_seconds,
+)
+
+# Which transcript source worked for each video: captions, auto_captions or whisper
+tiers = SqliteDict("db.sqlite", tablename="transcript_tiers", autocommit=True)
+
+
+def is_host(host, domain):
+    return host == domain or host.endswith(f".{domain}")
 
 
 def get_youtube_video_id(url):
     parsed_url = urlparse(url)
-    if parsed_url.netloc == "youtu.be":
+    host = (parsed_url.hostname or "").lower()
+    if is_host(host, "youtu.be"):
         return parsed_url.path[1:]
-    if parsed_url.netloc in ("www.youtube.com", "youtube.com"):
+    # www, m and music all serve the same videos
+    if is_host(host, "youtube.com"):
         if parsed_url.path == "/watch":
             parsed_qs = parse_qs(parsed_url.query)
             return parsed_qs.get("v", [None])[0]
@@ -31,11 +46,32 @@ def get_youtube_video_id(url):
 
 
 def fetch_transcript(video_id):
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api.formatters import TextFormatter
+
     formatter = TextFormatter()
     transcript = YouTubeTranscriptApi.get_transcript(video_id)
     return formatter.format_transcript(transcript=transcript)
 
 
+def fetch_captions(video_id, generated=False):
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+    if generated:
+        transcript = transcripts.find_generated_transcript(CAPTION_LANGUAGES)
+    else:
+        transcript = transcripts.find_manually_created_transcript(CAPTION_LANGUAGES)
+    return [
+        {
+            "start": caption["start"],
+            "end": caption["start"] + caption["duration"],
+            "text": caption["text"].replace("\n", " "),
+        }
+        for caption in transcript.fetch()
+    ]
+
+
 def format_timestamp(
     seconds: float, always_include_hours: bool = False, decimal_marker: str = "."
 ):
@@ -70,43 +106,103 @@ def process_segment(segment: dict, line_length: int = 0):
     return segment
 
 
-def generate_srt(transcript: Iterator[dict], line_length: int = 80) -> str:
-    srt_content = ""
+def srt_block(index: int, segment: dict, line_length: int = 80) -> str:
+    segment = process_segment(segment, line_length=line_length)
+    return (
+        f"\n{index}\n"
+        f"{format_timestamp(segment['start'], always_include_hours=True, decimal_marker=',')} --> "
+        f"{format_timestamp(segment['end'], always_include_hours=True, decimal_marker=',')}\n"
+        f"{segment['text'].strip().replace('-->', '->')}\n"
+    )
+
+
+def srt_blocks(transcript: Iterator[dict], line_length: int = 80) -> Iterator[str]:
+    """Yield the SRT block of each segment as it is produced."""
     for i, segment in enumerate(transcript, start=1):
-        segment = process_segment(segment, line_length=line_length)
-        srt_segment = (
-            f"\n{i}\n"
-            f"{format_timestamp(segment['start'], always_include_hours=True, decimal_marker=',')} --> "
-            f"{format_timestamp(segment['end'], always_include_hours=True, decimal_marker=',')}\n"
-            f"{segment['text'].strip().replace('-->', '->')}\n"
-        )
-        srt_content += srt_segment
-
-    return srt_content
-
-
-async def youtube_to_text(url):
-    # Create a temporary file
-    with tempfile.NamedTemporaryFile(suffix=".webm", delete=True) as temp_audio:
-        # Initialize a YouTube object
-        youtube = pytube.YouTube(url)
-
-        # Get the audio stream
-        audio_stream = youtube.streams.filter(only_audio=True).first()
-
-        # Download the audio stream to temporary file
-        audio_stream.download(filename=temp_audio.name)
-
-        # Transcribe audio file asynchronously
-        result = await asyncio.to_thread(model.transcribe, audio=temp_audio.name)
-        # Return transcript text
-        return {
-            # "srt": generate_srt([s._asdict() for s in result]),
-            # "text": " ".join([s.text for s in result]),
-            "srt": generate_srt(result["segments"]),
-            "text": result["text"],
-        }
-        # return result["text"]
+        yield srt_block(i, segment, line_length)
+
+
+def generate_srt(transcript: Iterator[dict], line_length: int = 80) -> str:
+    return "".join(srt_blocks(transcript, line_length))
+
+
+def write_srt(transcript: Iterator[dict], path, line_length: int = 80):
+    """Write the SRT for ``transcript`` to ``path`` without building it in memory."""
+    with open(path, "w") as srt:
+        srt.writelines(srt_blocks(transcript, line_length))
+
+
+async def caption_transcript(video_id, srt_path):
+    """Published captions, else auto-generated ones, else ``None``.
+
+    The captions are written to ``srt_path`` as SRT, the text is returned.
+    """
+    from youtube_transcript_api import CouldNotRetrieveTranscript
+
+    if tiers.get(video_id) == "whisper":
+        return None
+    for tier, generated in (("captions", False), ("auto_captions", True)):
+        try:
+            segments = await asyncio.to_thread(fetch_captions, video_id, generated)
+        except CouldNotRetrieveTranscript as e:
+            logger.info(f"No {tier} for {video_id}: {type(e).__name__}")
+            continue
+        except Exception as e:
+            # Network and parse errors fall through as well, Whisper always works
+            logger.opt(exception=e).warning(f"Fetching {tier} for {video_id} failed")
+            continue
+        logger.info(f"Using {tier} for {video_id}")
+        tiers[video_id] = tier
+        # Joined first, write_srt wraps long lines in place
+        text = " ".join(segment["text"].strip() for segment in segments)
+        await asyncio.to_thread(write_srt, segments, srt_path)
+        return {"text": text, "tier": tier}
+    return None
+
+
+async def download_chunks(session, url, range_size=1024**2):
+    # YouTube throttles long plain downloads, fetch in ranges like pytube does
+    position = 0
+    while True:
+        async with session.get(
+            f"{url}&range={position}-{position + range_size - 1}"
+        ) as response:
+            response.raise_for_status()
+            received = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                received += len(chunk)
+                yield chunk
+        position += received
+        if received < range_size:
+            return
+
+
+def smallest_audio_stream(url):
+    import pytube
+
+    youtube = pytube.YouTube(url)
+    # Whisper resamples to 16 kHz mono anyway, the lowest bitrate is plenty
+    return youtube.streams.filter(only_audio=True).order_by("abr").first()
+
+
+async def youtube_to_text(url, srt_path):
+    """Transcribe ``url`` with Whisper, writing the SRT as segments arrive."""
+    audio_stream = await asyncio.to_thread(smallest_audio_stream, url)
+    logger.info(f"Streaming {audio_stream.abr} {audio_stream.mime_type} audio")
+
+    # Decode and transcribe while the audio is still downloading
+    text = []
+    async with aiohttp.ClientSession() as session:
+        audio = stream_audio(download_chunks(session, audio_stream.url))
+        with open(srt_path, "w") as srt:
+            index = 0
+            async for segment in asr.transcribe_stream(audio):
+                text.append(segment["text"])
+                index += 1
+                srt.write(srt_block(index, segment))
+                srt.flush()
+    tiers[get_youtube_video_id(url)] = "whisper"
+    return {"text": "".join(text), "tier": "whisper"}
 
 
 async def get_transcript(video_id):
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The bot imports its modules as top level modules, mirror that here
+sys.path.insert(0, str(Path(__file__).parent.parent / "paperboy"))
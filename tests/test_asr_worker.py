@@ -0,0 +1,154 @@
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+
+
+def test_split_on_silence():
+    from paperboy.asr_worker import SAMPLE_RATE, split_on_silence
+
+    samples = np.full(SAMPLE_RATE * 25, 10000, np.int16)
+    # A pause between 7.5 and 8 seconds and another one at 17 seconds
+    samples[int(SAMPLE_RATE * 7.5) : SAMPLE_RATE * 8] = 0
+    samples[SAMPLE_RATE * 17 : int(SAMPLE_RATE * 17.5)] = 0
+
+    pieces = split_on_silence(samples, target=10, search=5)
+
+    assert pieces[0][0] == 0 and pieces[-1][1] == len(samples)
+    cuts = [start / SAMPLE_RATE for start, _ in pieces[1:]]
+    assert 7.5 <= cuts[0] <= 8 and 17 <= cuts[1] <= 17.5
+    assert all(end - start <= SAMPLE_RATE * 10 for start, end in pieces)
+
+
+def test_short_audio_is_one_piece():
+    from paperboy.asr_worker import SAMPLE_RATE, split_on_silence
+
+    samples = np.zeros(SAMPLE_RATE * 3, np.int16)
+    assert split_on_silence(samples, target=10) == [(0, len(samples))]
+
+
+def test_stream_audio_from_bytes():
+    pytest.importorskip("imageio_ffmpeg")
+    from paperboy.asr_worker import SAMPLE_RATE, stream_audio
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(b"\x10\x00" * 2 * 44100 * 5)
+    data = buffer.getvalue()
+
+    async def download():
+        for i in range(0, len(data), 4097):
+            yield data[i : i + 4097]
+
+    async def main():
+        return [chunk async for chunk in stream_audio(download(), chunk_seconds=1)]
+
+    chunks = asyncio.run(main())
+    assert len(chunks) > 1
+    assert abs(sum(len(chunk) for chunk in chunks) - SAMPLE_RATE * 5) < 100
+
+
+def crash_once_worker(marker, threads, jobs, results, finished):
+    # Stands in for Whisper: dies on its first piece, echoes pieces afterwards
+    import os
+    from pathlib import Path
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, index, offset, pcm = job
+        results.put((os.getpid(), job_id, index, None))
+        if not Path(marker).exists():
+            Path(marker).touch()
+            results.close()
+            results.join_thread()
+            os._exit(1)
+        segment = {"start": offset, "end": offset + 1, "text": "ok"}
+        results.put((os.getpid(), job_id, index, [segment]))
+
+
+def test_dead_worker_is_replaced(tmp_path):
+    from paperboy.asr_worker import AsrPool
+
+    pool = AsrPool(
+        str(tmp_path / "crashed"),
+        processes=2,
+        poll_seconds=0.5,
+        target=crash_once_worker,
+    )
+
+    async def chunks():
+        yield np.zeros(1600, np.int16)
+
+    async def transcribe():
+        return [segment async for segment in pool.transcribe_stream(chunks())]
+
+    async def main():
+        with pytest.raises(RuntimeError, match="exited"):
+            await asyncio.wait_for(transcribe(), 20)
+        segments = await asyncio.wait_for(transcribe(), 20)
+        return segments, sum(worker.is_alive() for worker in pool._workers)
+
+    try:
+        segments, alive = asyncio.run(main())
+    finally:
+        pool.close()
+    assert [segment["text"] for segment in segments] == ["ok"]
+    assert alive == 2
+
+
+def slow_echo_worker(log, threads, jobs, results, finished):
+    # Stands in for Whisper: takes a while per piece and logs what it did
+    import os
+    import time
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, index, offset, pcm = job
+        skipped = finished[job_id % len(finished)] == job_id
+        with open(log, "a") as f:
+            f.write(f"{job_id} {'skipped' if skipped else 'done'}\n")
+        if skipped:
+            continue
+        results.put((os.getpid(), job_id, index, None))
+        time.sleep(0.3)
+        segment = {"start": offset, "end": offset + 1, "text": "ok"}
+        results.put((os.getpid(), job_id, index, [segment]))
+
+
+def test_abandoned_pieces_are_skipped(tmp_path):
+    from paperboy.asr_worker import SAMPLE_RATE, AsrPool
+
+    log = tmp_path / "log"
+    pool = AsrPool(str(log), processes=1, segment_seconds=2, target=slow_echo_worker)
+
+    async def chunks(seconds):
+        yield np.zeros(SAMPLE_RATE * seconds, np.int16)
+
+    async def main():
+        # Several pieces, the consumer leaves after the first
+        abandoned = pool.transcribe_stream(chunks(12), search=1)
+        await asyncio.wait_for(abandoned.__anext__(), 20)
+        await abandoned.aclose()
+        # Queued behind the abandoned pieces
+        stream = pool.transcribe_stream(chunks(1), search=1)
+        return [segment async for segment in stream]
+
+    try:
+        segments = asyncio.run(asyncio.wait_for(main(), 20))
+    finally:
+        pool.close()
+    assert [segment["text"] for segment in segments] == ["ok"]
+    lines = log.read_text().splitlines()
+    assert lines[-1] == "1 done"
+    # At most the piece that was being transcribed when the consumer left
+    assert lines[:-1].count("0 done") <= 2
+    assert lines.count("0 skipped") == len(lines) - 1 - lines.count("0 done")
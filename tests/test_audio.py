@@ -0,0 +1,36 @@
+import asyncio
+import io
+import wave
+
+
+def make_wav(samples, sample_rate=24000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples)
+    return buffer.getvalue()
+
+
+def test_wav_to_pcm():
+    from paperboy.audio import wav_to_pcm
+
+    assert wav_to_pcm(make_wav(b"\x01\x00" * 10), 24000) == b"\x01\x00" * 10
+
+
+def test_encoder_orders_chunks(tmp_path):
+    from paperboy.audio import PcmEncoder
+
+    output = tmp_path / "out.wav"
+
+    async def main():
+        async with PcmEncoder(output, 24000) as encoder:
+            await encoder.add(1, b"\x02\x00" * 24000)
+            await encoder.add(0, b"\x01\x00" * 12000)
+        return encoder.duration
+
+    assert asyncio.run(main()) == 1.5
+    with wave.open(str(output)) as wav:
+        frames = wav.readframes(wav.getnframes())
+    assert frames == b"\x01\x00" * 12000 + b"\x02\x00" * 24000
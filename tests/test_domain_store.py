@@ -0,0 +1,77 @@
+import pickle
+import sqlite3
+
+
+def test_migration(tmp_path):
+    from paperboy.domain_store import DomainProfile, DomainStore
+
+    path = tmp_path / "db.sqlite"
+    conn = sqlite3.connect(path)
+    # Layout written by SqliteDict("db.sqlite", autocommit=True)
+    conn.execute("CREATE TABLE unnamed (key TEXT PRIMARY KEY, value BLOB)")
+    conn.execute(
+        "INSERT INTO unnamed VALUES (?, ?)",
+        ("example.com", pickle.dumps({"whitelist": True, "paywall": True})),
+    )
+    conn.commit()
+    conn.close()
+
+    store = DomainStore(path)
+    assert store.get("example.com") == DomainProfile("example.com", True, True, 0)
+    store.close()
+
+    # Running again doesn't import the old rows a second time
+    store = DomainStore(path)
+    store.remove("example.com")
+    store.close()
+    assert "example.com" not in DomainStore(path)
+
+
+def test_write_behind_counts(tmp_path):
+    from paperboy.domain_store import DomainStore
+
+    path = tmp_path / "db.sqlite"
+    store = DomainStore(path, flush_interval=3600)
+    store.add("example.com", whitelist=True)
+    for _ in range(3):
+        store.increment("example.com")
+    assert store.get("example.com").count == 3
+    assert DomainStore(path).get("example.com").count == 0
+
+    store.update("example.com", paywall=True)
+    store.close()
+    profile = DomainStore(path).get("example.com")
+    assert (profile.count, profile.whitelist, profile.paywall) == (3, True, True)
+
+
+def test_filtered_pages(tmp_path):
+    from paperboy.domain_store import DomainStore
+
+    store = DomainStore(tmp_path / "db.sqlite")
+    for i in range(5):
+        store.add(f"site{i}.com", whitelist=i % 2 == 0, paywall=i == 4)
+        store.increment(f"site{i}.com", amount=i)
+
+    assert store.measure() == (5, 9)
+    assert store.measure(whitelist=True) == (3, 9)
+    page = store.query(whitelist=True, limit=2, offset=1)
+    assert [p.domain for p in page] == ["site2.com", "site4.com"]
+    assert [p.domain for p in store.query(paywall=True)] == ["site4.com"]
+    top = store.query(by_count=True, limit=2)
+    assert [(p.domain, p.count) for p in top] == [("site4.com", 4), ("site3.com", 3)]
+
+
+def test_rekey(tmp_path):
+    from paperboy.domain_store import DomainStore
+    from paperboy.urls import registered_domain
+
+    store = DomainStore(tmp_path / "db.sqlite")
+    store.add("www.example.com", whitelist=True)
+    store.add("example.com", paywall=True)
+    store.increment("www.example.com", 2)
+    store.increment("example.com")
+    store.rekey(registered_domain)
+    store.close()
+
+    profile = DomainStore(tmp_path / "db.sqlite").get("example.com")
+    assert (profile.whitelist, profile.paywall, profile.count) == (True, True, 3)
@@ -0,0 +1,120 @@
+import asyncio
+import gzip
+import threading
+
+import pytest
+from aiohttp import web
+
+
+def serve(handler, scenario):
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_conditional_refetch():
+    from paperboy.fetcher import Fetcher
+
+    statuses = []
+
+    async def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            statuses.append(304)
+            return web.Response(status=304)
+        statuses.append(200)
+        body = gzip.compress("<p>héllo</p>".encode())
+        return web.Response(
+            body=body,
+            headers={
+                "ETag": '"v1"',
+                "Content-Encoding": "gzip",
+                "Content-Type": "text/html; charset=utf-8",
+            },
+        )
+
+    async def scenario(base):
+        fetcher = Fetcher("test")
+        pages = [await fetcher.fetch(f"{base}/page") for _ in range(2)]
+        await fetcher.close()
+        return pages
+
+    assert serve(handler, scenario) == ["<p>héllo</p>", "<p>héllo</p>"]
+    assert statuses == [200, 304]
+
+
+def test_max_size():
+    from paperboy.fetcher import Fetcher
+
+    async def handler(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(4):
+            await response.write(b"x" * 1024)
+        return response
+
+    async def scenario(base):
+        fetcher = Fetcher("test", max_size=2048)
+        page = await fetcher.fetch(f"{base}/big")
+        await fetcher.close()
+        return page
+
+    assert serve(handler, scenario) is None
+
+
+def test_brotli_decoded_off_loop():
+    brotli = pytest.importorskip("brotli")
+    from paperboy.fetcher import ACCEPT_ENCODING, Fetcher
+
+    threads = []
+
+    def decode(body):
+        threads.append(threading.current_thread())
+        return body.decode()
+
+    async def handler(request):
+        assert "br" in request.headers["Accept-Encoding"]
+        return web.Response(
+            body=brotli.compress(b"<p>brotli</p>"),
+            headers={"Content-Encoding": "br", "Content-Type": "text/html"},
+        )
+
+    async def scenario(base):
+        fetcher = Fetcher("test", decode=decode)
+        page = await fetcher.fetch(f"{base}/page")
+        await fetcher.close()
+        return page
+
+    assert "br" in ACCEPT_ENCODING
+    assert serve(handler, scenario) == "<p>brotli</p>"
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_remembered_size():
+    from paperboy.fetcher import Fetcher
+
+    async def handler(request):
+        size = int(request.match_info["name"])
+        return web.Response(text="x" * size, headers={"ETag": '"v1"'})
+
+    async def scenario(base):
+        fetcher = Fetcher("test", remembered_size=100)
+        for size in (40, 50, 30, 200):
+            await fetcher.fetch(f"{base}/{size}")
+        await fetcher.close()
+        return fetcher
+
+    fetcher = serve(handler, scenario)
+    # The oldest page made way and the one over the cap was never kept
+    assert [url.rsplit("/", 1)[1] for url in fetcher._validators] == ["50", "30"]
+    assert fetcher._validators_size == 80
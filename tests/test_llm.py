@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+
+def serve(handler, scenario):
+    async def main():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(f"http://127.0.0.1:{port}/v1")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def completion(content):
+    return web.json_response(
+        {
+            "model": "fake",
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3},
+        }
+    )
+
+
+def test_retry_after():
+    from paperboy.llm import LLMClient
+
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        assert request.headers["Authorization"] == "Bearer key"
+        if len(calls) == 1:
+            return web.Response(status=429, headers={"retry-after-ms": "200"})
+        body = await request.json()
+        return completion(body["messages"][-1]["content"].upper())
+
+    async def scenario(base):
+        client = LLMClient("key", base_url=base)
+        result = await client.complete([{"role": "user", "content": "hi"}], "fake")
+        await client.close()
+        return result, client.stats
+
+    result, stats = serve(handler, scenario)
+    assert result.content == "HI"
+    assert result.tries == 2
+    assert (result.prompt_tokens, result.completion_tokens) == (12, 3)
+    assert calls[1] - calls[0] >= 0.2
+    assert stats["retries"] == 1 and stats["completion_tokens"] == 3
+
+
+def test_client_error_is_not_retried():
+    from paperboy.llm import LLMClient, LLMError
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return web.Response(status=400, text="bad request")
+
+    async def scenario(base):
+        client = LLMClient("key", base_url=base)
+        try:
+            with pytest.raises(LLMError) as error:
+                await client.complete([{"role": "user", "content": "hi"}], "fake")
+        finally:
+            await client.close()
+        return error.value.status
+
+    assert serve(handler, scenario) == 400
+    assert len(calls) == 1
+
+
+def test_deadline():
+    from paperboy.llm import LLMClient
+
+    released = asyncio.Event()
+
+    async def handler(request):
+        await released.wait()
+        return completion("late")
+
+    async def scenario(base):
+        client = LLMClient("key", base_url=base, deadline=0.2)
+        start = time.monotonic()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.complete([{"role": "user", "content": "hi"}], "fake")
+        finally:
+            released.set()
+            await client.close()
+        return time.monotonic() - start, client.stats["failures"]
+
+    elapsed, failures = serve(handler, scenario)
+    assert elapsed < 1
+    assert failures == 1
+
+
+def test_token_budget():
+    from paperboy.llm import LLMClient
+
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        return completion("ok")
+
+    async def scenario(base):
+        # Each call reserves about 1000 tokens, refilled at 1000 per second
+        client = LLMClient("key", base_url=base, tokens_per_minute=60000)
+        client.tokens._tokens = 1000
+        messages = [{"role": "user", "content": "hi"}]
+        await asyncio.gather(
+            *[client.complete(messages, "fake", max_tokens=990) for _ in range(2)]
+        )
+        await client.close()
+
+    serve(handler, scenario)
+    # The second call waits about a second for the bucket to refill
+    assert calls[1] - calls[0] > 0.5
@@ -0,0 +1,50 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+
+def test_timer_and_percentiles():
+    from paperboy.metrics import Metrics
+
+    metrics = Metrics()
+    for value in range(1, 101):
+        metrics.observe("stage_seconds", value / 10, stage="fetch", method="plain")
+    with pytest.raises(ValueError):
+        with metrics.timer("extract"):
+            raise ValueError
+    metrics.inc("upload_bytes_total", 512)
+
+    stats = metrics.percentiles()
+    count, p50, p95 = stats["fetch (plain)"]
+    assert (count, p50, p95) == (100, 5.1, 9.6)
+    assert stats["extract"][0] == 1
+    assert metrics.counters() == {
+        'stage_failures_total{stage="extract"}': 1,
+        "upload_bytes_total": 512,
+    }
+
+
+def test_scrape_endpoint():
+    from paperboy.metrics import Metrics
+
+    metrics = Metrics()
+    metrics.observe("stage_seconds", 0.3, stage="tts")
+    metrics.inc("result_cache_total", result="hit")
+
+    async def main():
+        runner = await metrics.serve("127.0.0.1", 0)
+        port = runner.addresses[0][1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as r:
+                    return await r.text()
+        finally:
+            await runner.cleanup()
+
+    text = asyncio.run(main())
+    assert "# TYPE paperboy_result_cache_total counter" in text
+    assert 'paperboy_result_cache_total{result="hit"} 1' in text
+    assert 'paperboy_stage_seconds_bucket{le="0.25",stage="tts"} 0' in text
+    assert 'paperboy_stage_seconds_bucket{le="0.5",stage="tts"} 1' in text
+    assert 'paperboy_stage_seconds_count{stage="tts"} 1' in text
@@ -0,0 +1,55 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+
+def test_still_video(tmp_path):
+    pytest.importorskip("imageio_ffmpeg")
+    from paperboy.audio import PcmEncoder
+    from paperboy.muxer import StillMuxer, probe_duration
+
+    image = Path(__file__).parent.parent / "cat_paper.jpg"
+    audio = tmp_path / "article.opus"
+
+    async def main():
+        async with PcmEncoder(audio, 24000) as encoder:
+            await encoder.add(0, b"\x00\x00" * 24000 * 3)
+        muxer = StillMuxer(image, tmp_path / "still")
+        filename, length = await muxer.make_video(audio)
+        return filename, length, await probe_duration(filename)
+
+    filename, length, duration = asyncio.run(main())
+    assert filename == str(tmp_path / "article.webm")
+    assert length.total_seconds() == pytest.approx(3, abs=0.1)
+    assert duration == pytest.approx(3, abs=0.3)
+    assert len(list((tmp_path / "still").iterdir())) == 1
+
+
+def test_video_parts(tmp_path):
+    pytest.importorskip("imageio_ffmpeg")
+    from paperboy.audio import PcmEncoder
+    from paperboy.muxer import StillMuxer
+
+    image = Path(__file__).parent.parent / "cat_paper.jpg"
+    audio = tmp_path / "article.opus"
+
+    async def main():
+        async with PcmEncoder(audio, 24000) as encoder:
+            await encoder.add(0, b"\x00\x00" * 24000 * 6)
+        muxer = StillMuxer(image, tmp_path / "still")
+        return await muxer.make_parts(audio, encoder.duration, 3)
+
+    videos = asyncio.run(main())
+    assert [Path(video).name for video, _ in videos] == [
+        f"article-part{i}.webm" for i in (1, 2, 3)
+    ]
+    # The audio pieces are only needed until they are muxed
+    assert not list(tmp_path.glob("article-part*.opus"))
+    # The audio is cut, not encoded again, so nothing is lost or repeated
+    assert sum(length.total_seconds() for _, length in videos) == pytest.approx(
+        6, abs=0.1
+    )
+    assert all(
+        length.total_seconds() == pytest.approx(2, abs=0.1) for _, length in videos
+    )
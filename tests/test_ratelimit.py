@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+
+def test_token_bucket_rate():
+    from paperboy.ratelimit import TokenBucket
+
+    bucket = TokenBucket(rate=100, capacity=5)
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(15):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 5 tokens are available at once, the other 10 arrive at 100/s
+    assert 0.08 < asyncio.run(main()) < 0.5
+
+
+def test_oversized_request():
+    from paperboy.ratelimit import TokenBucket
+
+    bucket = TokenBucket(rate=1000, capacity=10)
+
+    async def main():
+        await bucket.acquire(30)
+        return bucket.tokens
+
+    assert asyncio.run(main()) < 0
@@ -0,0 +1,119 @@
+import os
+import time
+
+
+def test_canonical_hit(tmp_path):
+    from paperboy.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path)
+    text_file = tmp_path / "story.txt"
+    text_file.write_text("story")
+    cache.put("https://Example.com:443/story#top", {"summary": "hi"}, [text_file])
+
+    assert cache.get("https://example.com/story") == {"summary": "hi"}
+    text_file.unlink()
+    assert cache.get("https://example.com/story") is None
+
+
+def test_lru_eviction(tmp_path):
+    from paperboy.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path, quota=25)
+    stray = tmp_path / "stray.mp3"
+    stray.write_bytes(b"x" * 10)
+    os.utime(stray, (0, 0))
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.txt"
+        path.write_bytes(b"x" * 10)
+        cache.put(f"https://example.com/{name}", {"name": name}, [path])
+        time.sleep(0.01)
+    cache.evict()
+
+    assert not stray.exists()
+    assert cache.get("https://example.com/a") is None
+    assert cache.get("https://example.com/c") == {"name": "c"}
+
+
+def test_recent_stray_kept(tmp_path):
+    from paperboy.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path, quota=15)
+    # Written by a job that hasn't finished yet
+    pending = tmp_path / "pending.opus"
+    pending.write_bytes(b"x" * 10)
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x" * 10)
+    cache.put("https://example.com/a", {"name": "a"}, [path])
+    cache.evict()
+
+    assert pending.exists()
+
+
+def test_file_key():
+    from paperboy.result_cache import ResultCache
+
+    key = ResultCache.file_key("https://Example.com/story#top")
+    assert key == ResultCache.file_key("https://example.com/story")
+    assert key != ResultCache.file_key("https://example.org/story")
+
+
+def test_short_ttl(tmp_path, monkeypatch):
+    from paperboy import result_cache
+    from paperboy.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path)
+    path = tmp_path / "a.txt"
+    path.write_text("a")
+    cache.put("https://example.com/a", {"summary": "extractive"}, [path], ttl=60)
+    assert cache.get("https://example.com/a") == {"summary": "extractive"}
+
+    now = time.time()
+    monkeypatch.setattr(result_cache.time, "time", lambda: now + 120)
+    assert cache.get("https://example.com/a") is None
+
+
+def test_index_without_ttl_column(tmp_path):
+    import sqlite3
+
+    from paperboy.result_cache import INDEX_NAME, ResultCache
+
+    conn = sqlite3.connect(tmp_path / INDEX_NAME)
+    conn.execute(
+        "CREATE TABLE results (url TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+        " files TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO results VALUES (?, ?, ?, ?, ?)",
+        ("https://example.com/old", '{"summary": "old"}', "[]", time.time(), 0),
+    )
+    conn.commit()
+    conn.close()
+
+    cache = ResultCache(tmp_path)
+    assert cache.get("https://example.com/old") == {"summary": "old"}
+
+
+def test_evict_periodically_off_loop(tmp_path):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from paperboy.result_cache import ResultCache
+
+    cache = ResultCache(tmp_path, quota=15, evict_interval=0.01)
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.txt"
+        path.write_bytes(b"x" * 10)
+        cache.put(f"https://example.com/{name}", {"name": name}, [path])
+        time.sleep(0.01)
+    # put no longer evicts
+    assert (tmp_path / "a.txt").exists()
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            task = asyncio.create_task(cache.evict_periodically(executor))
+            await asyncio.sleep(0.2)
+            task.cancel()
+
+    asyncio.run(main())
+    assert cache.get("https://example.com/a") is None
+    assert cache.get("https://example.com/b") == {"name": "b"}
@@ -0,0 +1,59 @@
+import asyncio
+
+
+def test_stage_limit():
+    from paperboy.scheduler import JobScheduler
+
+    scheduler = JobScheduler(workers=4, stage_limits={"video": 1})
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with scheduler.stage("video"):
+            peak = max(peak, scheduler.snapshot()["stages"]["video"][0])
+            await asyncio.sleep(0.01)
+
+    async def main():
+        for _ in range(4):
+            await scheduler.submit(job)
+        await scheduler.join()
+        await scheduler.close()
+
+    asyncio.run(main())
+    assert peak == 1
+
+
+def test_queue_position():
+    from paperboy.scheduler import JobScheduler
+
+    scheduler = JobScheduler(workers=1)
+
+    async def main():
+        release = asyncio.Event()
+        positions = [await scheduler.submit(release.wait) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.depth == 2
+        release.set()
+        await scheduler.join()
+        await scheduler.close()
+        return positions
+
+    assert asyncio.run(main()) == [0, 1, 2]
+
+
+def test_concurrent_queue_positions():
+    from paperboy.scheduler import JobScheduler
+
+    scheduler = JobScheduler(workers=1)
+
+    async def main():
+        release = asyncio.Event()
+        positions = await asyncio.gather(
+            *(scheduler.submit(release.wait) for _ in range(4))
+        )
+        release.set()
+        await scheduler.join()
+        await scheduler.close()
+        return positions
+
+    assert sorted(asyncio.run(main())) == [0, 1, 2, 3]
@@ -0,0 +1,48 @@
+import asyncio
+
+
+def test_waiters_share_one_flight():
+    from paperboy.singleflight import SingleFlight
+
+    flights = SingleFlight()
+    runs = []
+
+    async def request(key):
+        while key in flights:
+            await flights.wait(key)
+            if runs:
+                return "shared"
+        flights.claim(key)
+        try:
+            await asyncio.sleep(0.05)
+            runs.append(key)
+            return "ran"
+        finally:
+            flights.release(key)
+
+    async def main():
+        return await asyncio.gather(
+            *[request("https://example.com/a") for _ in range(3)]
+        )
+
+    assert asyncio.run(main()) == ["ran", "shared", "shared"]
+    assert runs == ["https://example.com/a"]
+
+
+def test_cancelled_waiter():
+    from paperboy.singleflight import SingleFlight
+
+    async def main():
+        flights = SingleFlight()
+        assert flights.claim("a")
+        assert not flights.claim("a")
+        waiter = asyncio.create_task(flights.wait("a"))
+        other = asyncio.create_task(flights.wait("a"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        flights.release("a")
+        await asyncio.wait_for(other, 1)
+        return len(flights)
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def speech(tmp_path, monkeypatch):
+    pytest.importorskip("google.cloud.texttospeech")
+    pytest.importorskip("imageio_ffmpeg")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    import speech
+
+    return speech
+
+
+def test_failed_chunk_cancels_the_rest(speech, tmp_path, monkeypatch):
+    cancelled = []
+
+    async def synthesize_chunk(text, voice_params, audio_config):
+        if text == "bad":
+            raise RuntimeError("TTS failed")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+
+    monkeypatch.setattr(speech, "synthesize_chunk", synthesize_chunk)
+    monkeypatch.setattr(speech.settings, "tts_concurrency", 4)
+
+    async def main():
+        chunks = ["one", "bad", "two", "three"]
+        with pytest.raises(RuntimeError, match="TTS failed"):
+            await asyncio.wait_for(
+                speech.text_to_speech(str(tmp_path / "a.opus"), chunks), 5
+            )
+        # Checked before asyncio.run cancels whatever is left over
+        return sorted(cancelled)
+
+    assert asyncio.run(main()) == ["one", "three", "two"]
@@ -0,0 +1,42 @@
+import pytest
+from loguru import logger
+
+
+@pytest.fixture
+def summerizer(monkeypatch):
+    pytest.importorskip("sumy")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    import summerizer
+
+    # One token per character keeps the arithmetic readable
+    monkeypatch.setattr(summerizer, "count_tokens", lambda text, model: len(text))
+    return summerizer
+
+
+def tiers(summerizer):
+    return [summerizer.Tier("small", 100, 20), summerizer.Tier("large", 400, 50)]
+
+
+def prompt(length):
+    # Four tokens of chat formatting are added per message
+    return [{"role": "user", "content": "x" * (length - 4)}]
+
+
+def test_route_small(summerizer):
+    assert summerizer.route(prompt(80), tiers(summerizer)).model == "small"
+
+
+def test_route_large(summerizer):
+    assert summerizer.route(prompt(81), tiers(summerizer)).model == "large"
+    assert summerizer.route(prompt(350), tiers(summerizer)).model == "large"
+
+
+def test_route_overflow_warns(summerizer):
+    warnings = []
+    handler = logger.add(warnings.append, level="WARNING")
+    try:
+        tier = summerizer.route(prompt(351), tiers(summerizer))
+    finally:
+        logger.remove(handler)
+    assert tier.model == "large"
+    assert len(warnings) == 1 and "overflow" in warnings[0]
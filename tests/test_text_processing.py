@@ -0,0 +1,49 @@
+def test_pack_sentences():
+    from paperboy.text_processing import pack_sentences
+
+    sentences = ["aaaa.", "bbbb.", "cccc.", "dd."]
+    assert pack_sentences(sentences, 11) == ["aaaa. bbbb.", "cccc. dd."]
+
+
+def test_pack_long_sentence():
+    from paperboy.text_processing import pack_sentences
+
+    chunks = pack_sentences(["short.", "one two three four five six"], 10)
+    assert chunks == ["short.", "one two", "three four", "five six"]
+    assert all(len(chunk) <= 10 for chunk in chunks)
+
+
+def test_pack_sentences_by_bytes():
+    from paperboy.text_processing import pack_sentences, utf8_size
+
+    sentences = ["ééé.", "ééé.", "ééé."]
+    chunks = pack_sentences(sentences, 15, size=utf8_size)
+    assert chunks == ["ééé. ééé.", "ééé."]
+    assert all(utf8_size(chunk) <= 15 for chunk in chunks)
+
+
+def test_pack_long_word():
+    from paperboy.text_processing import pack_sentences, utf8_size
+
+    chunks = pack_sentences(["ok.", "é" * 7], 4, size=utf8_size)
+    assert chunks == ["ok.", "éé", "éé", "éé", "é"]
+
+
+def test_check_nltk_data_resource(monkeypatch):
+    import nltk
+    from nltk.tokenize import punkt
+
+    from paperboy.text_processing import check_nltk_data
+
+    looked_up = []
+
+    def find(resource):
+        looked_up.append(resource)
+        raise LookupError(resource)
+
+    monkeypatch.setattr(nltk.data, "find", find)
+    monkeypatch.setattr(punkt, "PunktTokenizer", object, raising=False)
+    assert not check_nltk_data()
+    monkeypatch.delattr(punkt, "PunktTokenizer", raising=False)
+    assert not check_nltk_data()
+    assert looked_up == ["tokenizers/punkt_tab", "tokenizers/punkt"]
@@ -0,0 +1,32 @@
+def test_lru_eviction(tmp_path):
+    from paperboy.tts_cache import ChunkCache
+
+    cache = ChunkCache(tmp_path, max_bytes=20)
+    a, b, c = (ChunkCache.key(name.encode(), b"voice") for name in "abc")
+    cache.put(a, b"a" * 10)
+    cache.put(b, b"b" * 10)
+    assert cache.get(a) == b"a" * 10
+    cache.put(c, b"c" * 10)
+
+    assert cache.get(b) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "bytes": 20}
+    assert ChunkCache(tmp_path, max_bytes=20).get(c) == b"c" * 10
+
+
+def test_key_parts():
+    from paperboy.tts_cache import ChunkCache
+
+    assert ChunkCache.key(b"ab", b"c") != ChunkCache.key(b"a", b"bc")
+
+
+def test_concurrent_put(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from paperboy.tts_cache import ChunkCache
+
+    cache = ChunkCache(tmp_path)
+    key = ChunkCache.key(b"same text")
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache.put(key, b"x" * 100_000), range(32)))
+    assert cache.get(key) == b"x" * 100_000
+    assert cache.size == 100_000
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+
+def test_plan_fits_one_upload():
+    from paperboy.upload_plan import plan_upload, predict_size
+
+    # Ten minutes fit at the full bitrate
+    plan = plan_upload(600, 10 * 1024**2, video_bitrate=2000)
+    assert (plan.bitrate, plan.parts) == (64, 1)
+    assert plan.predicted_size == predict_size(600, 64, 2000)
+
+
+def test_plan_lowers_bitrate():
+    from paperboy.upload_plan import plan_upload
+
+    plan = plan_upload(40 * 60, 10 * 1024**2)
+    assert plan.parts == 1
+    assert plan.bitrate < 64
+    assert plan.predicted_size <= 10 * 1024**2 * 0.9
+    assert plan.audio_bitrate == f"{plan.bitrate}k"
+
+
+def test_plan_splits_into_parts():
+    from paperboy.upload_plan import BITRATES, plan_upload
+
+    plan = plan_upload(4 * 3600, 10 * 1024**2)
+    assert plan.bitrate == BITRATES[-1]
+    assert plan.parts == 4
+    assert plan.predicted_size / plan.parts <= 10 * 1024**2 * 0.9
+
+
+def test_upload_limit():
+    from paperboy.upload_plan import DEFAULT_LIMIT, upload_limit
+
+    guild = SimpleNamespace(filesize_limit=50 * 1024**2)
+    assert upload_limit(SimpleNamespace(guild=guild)) == 50 * 1024**2
+    assert upload_limit(SimpleNamespace(guild=None)) == DEFAULT_LIMIT
@@ -0,0 +1,33 @@
+import pytest
+
+
+def test_canonical_url():
+    from paperboy.urls import canonical_url
+
+    assert (
+        canonical_url("HTTPS://News.BBC.co.uk:443/story?utm_source=tw&id=3#top")
+        == "https://news.bbc.co.uk/story?id=3"
+    )
+    assert (
+        canonical_url("https://www.youtube.com/watch?v=abc&si=xyz")
+        == "https://www.youtube.com/watch?v=abc"
+    )
+
+
+def test_registered_domain():
+    from paperboy.urls import registered_domain
+
+    assert registered_domain("www.bbc.co.uk") == "bbc.co.uk"
+    assert registered_domain("WWW.Example.com:8080") == "example.com"
+    assert registered_domain("localhost") == "localhost"
+
+
+def test_find_urls():
+    pytest.importorskip("urlextract")
+    from paperboy.urls import find_urls
+
+    message = (
+        "see https://example.com/a?utm_source=x and https://example.com/a "
+        "but not example.org"
+    )
+    assert find_urls(message) == ["https://example.com/a"]
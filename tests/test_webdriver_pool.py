@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+
+import pytest
+
+
+class FakeDriver:
+    ids = itertools.count()
+
+    def __init__(self, profile_dir):
+        self.profile_dir = profile_dir
+        self.id = next(self.ids)
+        self.alive = True
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise ConnectionError("session gone")
+        return "about:blank"
+
+    def quit(self):
+        self.alive = False
+
+
+def test_recycling():
+    from paperboy.webdriver_pool import WebDriverPool
+
+    pool = WebDriverPool(FakeDriver, size=1, max_uses=2)
+
+    async def main():
+        await pool.start()
+        seen = []
+        for _ in range(3):
+            async with pool.session() as driver:
+                seen.append(driver.id)
+        async with pool.session() as driver:
+            driver.alive = False
+        async with pool.session() as driver:
+            seen.append(driver.id)
+        return seen
+
+    first, second, third, fourth = asyncio.run(main())
+    assert first == second != third
+    assert third != fourth
+
+
+def test_profile_dirs():
+    from paperboy.webdriver_pool import WebDriverPool
+
+    pool = WebDriverPool(FakeDriver, size=2, profile_root="/tmp/profile")
+
+    async def main():
+        async with pool.session() as a, pool.session() as b:
+            return {a.profile_dir, b.profile_dir}
+
+    assert asyncio.run(main()) == {"/tmp/profile-0", "/tmp/profile-1"}
+
+
+def test_stand_in_server():
+    webdriver = pytest.importorskip("selenium.webdriver")
+    from aiohttp import web
+    from paperboy.webdriver_pool import WebDriverPool
+
+    sessions = {}
+
+    async def new_session(request):
+        session_id = str(len(sessions))
+        sessions[session_id] = "about:blank"
+        return web.json_response(
+            {"value": {"sessionId": session_id, "capabilities": {}}}
+        )
+
+    async def navigate(request):
+        body = await request.json()
+        sessions[request.match_info["id"]] = body["url"]
+        return web.json_response({"value": None})
+
+    async def current_url(request):
+        return web.json_response({"value": sessions[request.match_info["id"]]})
+
+    async def source(request):
+        url = sessions[request.match_info["id"]]
+        return web.json_response({"value": f"<html>{url}</html>"})
+
+    async def delete(request):
+        sessions.pop(request.match_info["id"])
+        return web.json_response({"value": None})
+
+    app = web.Application()
+    app.router.add_post("/session", new_session)
+    app.router.add_post("/session/{id}/url", navigate)
+    app.router.add_get("/session/{id}/url", current_url)
+    app.router.add_get("/session/{id}/source", source)
+    app.router.add_delete("/session/{id}", delete)
+
+    async def main():
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        def factory(profile_dir):
+            options = webdriver.ChromeOptions()
+            options.add_argument(f"--user-data-dir={profile_dir}")
+            return webdriver.Remote(f"http://127.0.0.1:{port}", options=options)
+
+        pool = WebDriverPool(factory, size=1)
+        await pool.start()
+        async with pool.session() as driver:
+            await asyncio.to_thread(driver.get, "http://example.com/")
+            page = await asyncio.to_thread(lambda: driver.page_source)
+        await pool.close()
+        await runner.cleanup()
+        return page
+
+    assert asyncio.run(main()) == "<html>http://example.com/</html>"
+    assert not sessions
+
+
+def test_cancelled_session_frees_slot():
+    from paperboy.webdriver_pool import WebDriverPool
+
+    pool = WebDriverPool(FakeDriver, size=1)
+
+    async def main():
+        entered = asyncio.Event()
+
+        async def job():
+            async with pool.session():
+                entered.set()
+                await asyncio.sleep(60)
+
+        task = asyncio.create_task(job())
+        await entered.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def next_job():
+            async with pool.session() as driver:
+                return driver.alive
+
+        return await asyncio.wait_for(next_job(), 5)
+
+    assert asyncio.run(main())
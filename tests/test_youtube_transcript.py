@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pytube")
+pytest.importorskip("youtube_transcript_api")
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": " Hello --> world "},
+    {"start": 3661.25, "end": 3662.0, "text": "Later"},
+]
+
+EXPECTED = (
+    "\n1\n00:00:00,000 --> 00:00:02,500\nHello -> world\n"
+    "\n2\n01:01:01,250 --> 01:01:02,000\nLater\n"
+)
+
+
+@pytest.fixture
+def youtube_transcript(tmp_path, monkeypatch):
+    # The module opens db.sqlite in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    import youtube_transcript
+
+    return youtube_transcript
+
+
+def test_generate_srt(youtube_transcript):
+    segments = [dict(segment) for segment in SEGMENTS]
+    assert youtube_transcript.generate_srt(segments) == EXPECTED
+
+
+def test_write_srt(youtube_transcript, tmp_path):
+    segments = (dict(segment) for segment in SEGMENTS)
+    youtube_transcript.write_srt(segments, tmp_path / "video.srt")
+    assert (tmp_path / "video.srt").read_text() == EXPECTED
+
+
+def caption_stub(youtube_transcript, monkeypatch, outcomes):
+    """Make ``fetch_captions`` return or raise per tier, recording the calls."""
+    calls = []
+
+    def fetch_captions(video_id, generated=False):
+        calls.append("auto_captions" if generated else "captions")
+        outcome = outcomes[calls[-1]]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(youtube_transcript, "fetch_captions", fetch_captions)
+    monkeypatch.setattr(youtube_transcript, "tiers", {})
+    return calls
+
+
+def test_caption_tiers(youtube_transcript, monkeypatch, tmp_path):
+    from youtube_transcript_api import TranscriptsDisabled
+
+    segments = [{"start": 0.0, "end": 1.0, "text": " hi "}]
+    outcomes = {"captions": segments, "auto_captions": segments}
+    calls = caption_stub(youtube_transcript, monkeypatch, outcomes)
+    result = asyncio.run(youtube_transcript.caption_transcript("a", tmp_path / "a.srt"))
+    assert (result["tier"], result["text"], calls) == ("captions", "hi", ["captions"])
+    assert (
+        tmp_path / "a.srt"
+    ).read_text() == "\n1\n00:00:00,000 --> 00:00:01,000\nhi\n"
+
+    outcomes["captions"] = TranscriptsDisabled("b")
+    calls = caption_stub(youtube_transcript, monkeypatch, outcomes)
+    result = asyncio.run(youtube_transcript.caption_transcript("b", tmp_path / "b.srt"))
+    assert result["tier"] == "auto_captions"
+    assert youtube_transcript.tiers == {"b": "auto_captions"}
+
+
+def test_caption_errors_fall_back_to_whisper(youtube_transcript, monkeypatch, tmp_path):
+    outcomes = {
+        "captions": ConnectionError("reset"),
+        "auto_captions": ValueError("bad caption XML"),
+    }
+    calls = caption_stub(youtube_transcript, monkeypatch, outcomes)
+    srt_path = tmp_path / "c.srt"
+    assert asyncio.run(youtube_transcript.caption_transcript("c", srt_path)) is None
+    assert calls == ["captions", "auto_captions"]
+    assert not srt_path.exists()
+
+
+def test_whisper_videos_skip_captions(youtube_transcript, monkeypatch, tmp_path):
+    calls = caption_stub(youtube_transcript, monkeypatch, {})
+    youtube_transcript.tiers["d"] = "whisper"
+    srt_path = tmp_path / "d.srt"
+    assert asyncio.run(youtube_transcript.caption_transcript("d", srt_path)) is None
+    assert calls == []
+
+
+def test_whisper_srt_written_as_segments_arrive(
+    youtube_transcript, monkeypatch, tmp_path
+):
+    srt_path = tmp_path / "e.srt"
+    on_disk = []
+
+    class Asr:
+        async def transcribe_stream(self, audio):
+            for segment in SEGMENTS:
+                yield dict(segment)
+                on_disk.append(srt_path.read_text())
+
+    class Stream:
+        abr, mime_type, url = "48kbps", "audio/webm", "https://example.com/audio"
+
+    monkeypatch.setattr(youtube_transcript, "asr", Asr())
+    monkeypatch.setattr(youtube_transcript, "smallest_audio_stream", lambda url: Stream)
+    monkeypatch.setattr(youtube_transcript, "stream_audio", lambda chunks: None)
+    monkeypatch.setattr(youtube_transcript, "tiers", {})
+    url = "https://youtu.be/e"
+    result = asyncio.run(youtube_transcript.youtube_to_text(url, srt_path))
+    assert result == {"text": " Hello --> world Later", "tier": "whisper"}
+    assert on_disk == [EXPECTED[: EXPECTED.index("\n2\n")], EXPECTED]
+    assert youtube_transcript.tiers == {"e": "whisper"}
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://youtu.be/abc123",
+        "https://www.youtube.com/watch?v=abc123",
+        "https://m.youtube.com/watch?v=abc123&t=10",
+        "https://music.youtube.com/watch?v=abc123",
+        "https://WWW.YouTube.com:443/embed/abc123",
+    ],
+)
+def test_video_id(youtube_transcript, url):
+    assert youtube_transcript.get_youtube_video_id(url) == "abc123"
+
+
+def test_video_id_other_hosts(youtube_transcript):
+    assert youtube_transcript.get_youtube_video_id("https://notyoutube.com/v/x") is None